@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Ad-hoc performance checks for OpenScriber.
+
+Usage:
+    python benchmark.py vad session.wav [more.wav ...] [--decode]
+    python benchmark.py startup [--runs N]
+    python benchmark.py threads [--audio session.wav] [--windows N] [--tokens N]
+"""
+import argparse
+import contextlib
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+from openscriber.openscriber import (
+    LLM_MODEL, TRANSCRIBE_BATCH_SIZE, WHISPER_MODEL, WHISPER_SAMPLE_RATE, WINDOW_SAMPLES,
+    cpu_scheduler, decode_audio_windows, detect_speech, iter_transcribe_chunks,
+    load_audio_16k, plan_windows, use_llm
+)
+
+
+def bench_vad(args):
+    """Report how many 30-second windows voice-activity detection skips."""
+    total_fixed = total_silent = total_packed = 0
+    for path in args.files:
+        audio = load_audio_16k(path)
+        duration = audio.shape[0] / WHISPER_SAMPLE_RATE
+        fixed = plan_windows(audio, 0, vad=False)
+
+        start = time.perf_counter()
+        regions = detect_speech(audio)
+        packed = plan_windows(audio, 0, vad=True)
+        vad_ms = (time.perf_counter() - start) * 1000
+
+        silent = sum(1 for s, e in fixed if not any(rs < e and re > s for rs, re in regions))
+        total_fixed += len(fixed)
+        total_silent += silent
+        total_packed += len(packed)
+        print(f"{path}: {duration:.0f} s, {len(fixed)} windows, "
+              f"{silent} without speech ({silent / max(len(fixed), 1):.0%} skipped), "
+              f"{len(packed)} after packing, VAD {vad_ms:.0f} ms")
+
+        if args.decode:
+            for label, windows in (("fixed", fixed), ("vad", packed)):
+                start = time.perf_counter()
+                for _ in iter_transcribe_chunks(audio, 0, windows):
+                    pass
+                print(f"  decode {label}: {time.perf_counter() - start:.1f} s for {len(windows)} windows")
+
+    if len(args.files) > 1:
+        print(f"total: {total_fixed} windows, {total_silent / max(total_fixed, 1):.0%} skipped, "
+              f"{1 - total_packed / max(total_fixed, 1):.0%} fewer decodes after packing")
+
+
+# Run in a fresh interpreter so nothing is already imported or cached in-process
+STARTUP_PROBE = """
+import sys, time
+start = time.perf_counter()
+from PyQt5.QtWidgets import QApplication
+import openscriber.openscriber as app_module
+imported = time.perf_counter()
+app = QApplication(sys.argv)
+login = app_module.LoginDialog()
+login.show()
+app.processEvents()
+shown = time.perf_counter()
+heavy = [name for name in ("torch", "whisper", "pyaudio", "ctransformers") if name in sys.modules]
+print(imported - start, shown - start, ",".join(heavy))
+"""
+
+
+def bench_startup(args):
+    """Time from interpreter start to the login dialog being on screen."""
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    imports, dialogs, totals = [], [], []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, "-c", STARTUP_PROBE], env=env, check=True,
+                             capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__))).stdout.split()
+        totals.append(time.perf_counter() - start)
+        imports.append(float(out[0]))
+        dialogs.append(float(out[1]))
+        heavy = out[2] if len(out) > 2 else ""
+    print(f"module import: {statistics.median(imports) * 1000:.0f} ms, "
+          f"login dialog shown: {statistics.median(dialogs) * 1000:.0f} ms, "
+          f"process total: {statistics.median(totals) * 1000:.0f} ms (median of {args.runs})")
+    print(f"heavy modules loaded before login: {heavy or 'none'}")
+
+
+THREADS_PROMPT = "Summarize the following text concisely:\nThe patient reports sleeping better since the last visit.\nSummary:"
+
+
+def bench_threads(args):
+    """Whisper and LLM throughput alone, together with the core split, and together without it."""
+    topology = cpu_scheduler.topology
+    print(f"CPUs: {topology['logical']} logical, {topology['physical']} physical, "
+          f"cgroup limit {topology['cgroup_limit'] or 'none'}, {topology['usable']} usable")
+
+    if args.audio:
+        audio = load_audio_16k(args.audio)[:args.windows * WINDOW_SAMPLES]
+    else:
+        audio = (np.random.default_rng(0).standard_normal(args.windows * WINDOW_SAMPLES) * 0.01).astype(np.float32)
+    windows = [audio[i:i + WINDOW_SAMPLES] for i in range(0, audio.shape[0], WINDOW_SAMPLES)]
+
+    def run_whisper(results):
+        start = time.perf_counter()
+        for b in range(0, len(windows), TRANSCRIBE_BATCH_SIZE):
+            decode_audio_windows(windows[b:b + TRANSCRIBE_BATCH_SIZE])
+        results["whisper"] = len(windows) / (time.perf_counter() - start)
+
+    def run_llm(results):
+        with use_llm() as model:
+            start = time.perf_counter()
+            generated = sum(1 for _ in model.stream(THREADS_PROMPT, args.tokens))
+            results["llm"] = generated / (time.perf_counter() - start)
+
+    # Load both models up front so loading isn't timed
+    decode_audio_windows(windows[:1])
+    with use_llm() as model:
+        model.complete("Hello", max_new_tokens=1)
+
+    configs = [
+        ("whisper alone", True, [run_whisper]),
+        ("llm alone", True, [run_llm]),
+        ("both, cores split", True, [run_whisper, run_llm]),
+        ("both, all cores each", False, [run_whisper, run_llm]),
+    ]
+    for label, share, jobs in configs:
+        cpu_scheduler.share_cores = share
+        results = {}
+        # Mark both busy for the whole run so each sees the other from its first call
+        together = len(jobs) > 1
+        with cpu_scheduler.running(WHISPER_MODEL) if together else contextlib.nullcontext(), \
+                cpu_scheduler.running(LLM_MODEL) if together else contextlib.nullcontext():
+            threads = [threading.Thread(target=job, args=(results,)) for job in jobs]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        parts = []
+        if "whisper" in results:
+            parts.append(f"whisper {results['whisper']:.2f} windows/s")
+        if "llm" in results:
+            parts.append(f"llm {results['llm']:.1f} tokens/s")
+        print(f"{label}: " + ", ".join(parts))
+    cpu_scheduler.share_cores = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    vad = commands.add_parser("vad", help="fraction of windows skipped by voice-activity detection")
+    vad.add_argument("files", nargs="+", help="recordings to analyse")
+    vad.add_argument("--decode", action="store_true", help="also time Whisper decoding with and without VAD")
+    vad.set_defaults(func=bench_vad)
+
+    startup = commands.add_parser("startup", help="time until the login dialog is shown")
+    startup.add_argument("--runs", type=int, default=5, help="cold starts to take the median of")
+    startup.set_defaults(func=bench_startup)
+
+    threads = commands.add_parser("threads", help="Whisper and LLM throughput with and without the core split")
+    threads.add_argument("--audio", help="recording to decode (default: low-level noise)")
+    threads.add_argument("--windows", type=int, default=8, help="30-second windows to decode per run")
+    threads.add_argument("--tokens", type=int, default=64, help="tokens to generate per run")
+    threads.set_defaults(func=bench_threads)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,43 +4,87 @@ os.environ["LLAMA_DISABLE_METAL"] = "1"
 os.environ["GGML_METAL_DISABLE"] = "1"
 os.environ["LLAMA_DISABLE_MLOCK"] = "1"
 import threading
+import contextlib
+import importlib
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from multiprocessing import shared_memory, resource_tracker
 import time
+import queue
+import heapq
+import collections
+import itertools
 import wave
 import datetime
 import numpy as np
 import json
-import pyaudio
-from cryptography.fernet import Fernet
-import whisper
+import re
+import sqlite3
+from cryptography.fernet import Fernet, MultiFernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+import base64
 import hashlib
+import hmac
+import struct
+import math
 
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QPushButton, QTextEdit, QVBoxLayout, QWidget,
-    QLabel, QListWidget, QHBoxLayout, QLineEdit, QDialog,
-    QFormLayout, QMessageBox, QProgressBar, QInputDialog
+    QLabel, QListWidget, QListWidgetItem, QHBoxLayout, QLineEdit, QDialog,
+    QFormLayout, QMessageBox, QProgressBar, QInputDialog, QCheckBox, QFileDialog
 )
 from PyQt5.QtCore import Qt, QTimer, QEvent, pyqtSignal
+from PyQt5.QtGui import QTextDocument
 
-# --- Auto-install required packages ---
-try:
-    from huggingface_hub import hf_hub_download
-except ImportError:
-    print("Installing huggingface_hub...")
-    os.system(f"{sys.executable} -m pip install --upgrade huggingface_hub")
-    from huggingface_hub import hf_hub_download
-
-try:
-    from ctransformers import AutoModelForCausalLM
-except ImportError:
-    print("Installing ctransformers...")
-    os.system(f"{sys.executable} -m pip install ctransformers")
-    from ctransformers import AutoModelForCausalLM
+# --- Lazy Imports ---
+class LazyModule:
+    """
+    Stand-in for a heavy module that is imported on first attribute access.
+
+    torch, Whisper, PyAudio and the LLM runtime together take seconds to
+    import, so they are deferred until a recording or model actually needs
+    them and the login dialog appears straight away. When `install` is set
+    and the import fails, those pip arguments are used to install the
+    package first, as the app has always done for its LLM dependencies.
+    """
+    def __init__(self, name, install=None):
+        self._name = name
+        self._install = install
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._module is None:
+                try:
+                    self._module = importlib.import_module(self._name)
+                except ImportError:
+                    if not self._install:
+                        raise
+                    print(f"Installing {self._name}...")
+                    os.system(f"{sys.executable} -m pip install {self._install}")
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        module = self._module or self._load()
+        return getattr(module, attr)
+
+torch = LazyModule("torch")
+whisper = LazyModule("whisper")
+pyaudio = LazyModule("pyaudio")
+huggingface_hub = LazyModule("huggingface_hub", install="--upgrade huggingface_hub")
+ctransformers = LazyModule("ctransformers", install="ctransformers")
+llama_cpp = LazyModule("llama_cpp")  # Optional; building it needs a compiler, so it isn't auto-installed
 
 # --- Global Constants & Directories ---
 TRANSCRIPTS_DIR = "transcripts"
 AUDIO_DIR = "audio"
 KEY_FILE = "key.key"
 PROMPTS_CONFIG_FILE = "prompts_config.json"
+PROMPT_CACHE_DIR = "prompt_cache"
 
 # Default psychiatric prompts
 DEFAULT_PROMPTS = [
@@ -106,14 +150,8 @@ class PromptConfig:
                 break
         self.save_config()
 
-for folder in [TRANSCRIPTS_DIR, AUDIO_DIR]:
-    if not os.path.exists(folder):
-        os.makedirs(folder)
-
 # --- Model Download Helper and Constants for Llama ---
 MODELS_DIR = "models"
-if not os.path.exists(MODELS_DIR):
-    os.makedirs(MODELS_DIR)
 
 MODEL_REPO = "TheBloke/Mistral-7B-Instruct-v0.2-GGUF"
 MODEL_FILENAME = "mistral-7b-instruct-v0.2.Q5_K_M.gguf"
@@ -126,8 +164,9 @@ def download_llama_model():
         return True
     
     print(f"Downloading Mistral 7B model to {MODEL_PATH}...")
+    os.makedirs(MODELS_DIR, exist_ok=True)
     try:
-        hf_hub_download(
+        huggingface_hub.hf_hub_download(
             repo_id=MODEL_REPO,
             filename=MODEL_FILENAME,
             local_dir=MODELS_DIR,
@@ -142,18 +181,46 @@ def download_llama_model():
         return False
 
 # --- Encryption Helpers ---
-def load_or_create_key():
-    if os.path.exists(KEY_FILE):
-        with open(KEY_FILE, "rb") as f:
+LEGACY_KEY_FILE = "key.key"  # Shared key used before per-user keys were loaded
+
+def load_or_create_key(key_file=None):
+    key_file = key_file or KEY_FILE
+    if os.path.exists(key_file):
+        with open(key_file, "rb") as f:
             key = f.read()
     else:
         key = Fernet.generate_key()
-        with open(KEY_FILE, "wb") as f:
+        with open(key_file, "wb") as f:
             f.write(key)
     return key
 
-encryption_key = load_or_create_key()
-fernet = Fernet(encryption_key)
+fernet = None      # Set by init_encryption() once the user has logged in
+search_key = None  # Blinds search-index terms; derived from the user's key
+audio_key = None   # Root of the per-file keys for session audio; derived from the user's key
+
+def derive_key(key, purpose, length=32, salt=None):
+    """Derive an independent subkey for `purpose` from raw key material with HKDF."""
+    return HKDF(algorithm=hashes.SHA256(), length=length, salt=salt,
+                info=b"openscriber " + purpose.encode()).derive(key)
+
+def init_encryption():
+    """
+    Load the current user's key into the module-wide `fernet`.
+
+    New data is encrypted with the user's key. Files written by earlier
+    versions, which encrypted everything with the shared key.key in the
+    working directory, still decrypt because that key is kept as a fallback.
+    """
+    global fernet, search_key, audio_key
+    key = load_or_create_key()
+    raw_key = base64.urlsafe_b64decode(key)
+    search_key = derive_key(raw_key, "search index")
+    audio_key = derive_key(raw_key, "audio")
+    keys = [Fernet(key)]
+    if os.path.abspath(KEY_FILE) != os.path.abspath(LEGACY_KEY_FILE) and os.path.exists(LEGACY_KEY_FILE):
+        with open(LEGACY_KEY_FILE, "rb") as f:
+            keys.append(Fernet(f.read()))
+    fernet = MultiFernet(keys)
 
 def save_encrypted_transcript(filename, transcript_text):
     # Encrypts and writes transcript text to disk.
@@ -170,34 +237,2220 @@ def load_encrypted_transcript(filename):
     except Exception as e:
         return "Error decrypting file."
 
+# --- Transcript Store ---
+TRANSCRIPT_DB_NAME = "transcripts.db"
+TRANSCRIPT_PAGE_SIZE = 100
+TRANSCRIPT_PREVIEW_CHARS = 120
+SEARCH_TERM_BYTES = 16      # Truncated HMAC stored per indexed term
+SEARCH_MIN_TERM_CHARS = 2   # Shorter words aren't indexed
+
+def search_terms(text):
+    """Distinct case-folded words in `text`, as indexed and searched."""
+    return {w for w in re.findall(r"\w+", text.casefold()) if len(w) >= SEARCH_MIN_TERM_CHARS}
+
+def blind_term(term):
+    # Keyed so the index reveals neither the words nor, without the key, which word a query is for
+    return hmac.new(search_key, term.encode(), hashlib.sha256).digest()[:SEARCH_TERM_BYTES]
+
+class TranscriptStore:
+    """
+    SQLite index of a user's transcripts.
+
+    The transcript text, a short preview and the source recording's name
+    are stored Fernet-encrypted. Only the creation time, duration and
+    prompt counts are stored in the clear. Listing pages through an index
+    on the creation time, so its cost doesn't grow with the number of
+    sessions, and nothing is decrypted until a transcript is opened. The
+    connection is shared between threads behind a lock.
+
+    Full-text search uses an inverted index kept in the same database and
+    updated in the same transaction as each insert. Terms are stored as
+    keyed HMACs of the case-folded words, so the index holds no plaintext
+    and a query is a handful of primary-key lookups intersected in SQL;
+    no transcript has to be decrypted to answer it. Matching is on whole
+    words.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript("""
+                CREATE TABLE IF NOT EXISTS transcripts (
+                    id INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    duration REAL,
+                    prompts_answered INTEGER NOT NULL DEFAULT 0,
+                    prompts_total INTEGER NOT NULL DEFAULT 0,
+                    audio BLOB,
+                    preview BLOB NOT NULL,
+                    body BLOB NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS transcripts_by_created ON transcripts (created DESC, id DESC);
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+                CREATE TABLE IF NOT EXISTS search_postings (
+                    term BLOB NOT NULL,
+                    transcript_id INTEGER NOT NULL,
+                    PRIMARY KEY (term, transcript_id)
+                ) WITHOUT ROWID;
+            """)
+        self.build_search_index()
+
+    def add(self, transcript, created=None, duration=None, audio_file=None, name=None, body=None):
+        """
+        Store a transcript and return its id. `body` may pass an already
+        encrypted copy of `transcript`, as migration does.
+        """
+        with self._lock, self._db:
+            return self._insert(transcript, created, duration, audio_file, name, body)
+
+    def _insert(self, transcript, created=None, duration=None, audio_file=None, name=None, body=None):
+        # Caller holds the lock and the transaction
+        created = created if created is not None else time.time()
+        name = name or "transcript_" + datetime.datetime.fromtimestamp(created).strftime("%Y%m%d_%H%M%S")
+        row = (
+            name, created, duration,
+            fernet.encrypt(os.path.basename(audio_file).encode()) if audio_file else None,
+            fernet.encrypt(transcript[:TRANSCRIPT_PREVIEW_CHARS].encode()),
+            body or fernet.encrypt(transcript.encode()),
+        )
+        cursor = self._db.execute(
+            "INSERT INTO transcripts (name, created, duration, audio, preview, body) "
+            "VALUES (?, ?, ?, ?, ?, ?)", row)
+        self._index(cursor.lastrowid, transcript)
+        return cursor.lastrowid
+
+    def _index(self, transcript_id, transcript):
+        # Caller holds the lock and the transaction
+        self._db.executemany(
+            "INSERT OR IGNORE INTO search_postings (term, transcript_id) VALUES (?, ?)",
+            ((blind_term(term), transcript_id) for term in search_terms(transcript)))
+
+    def build_search_index(self):
+        """
+        Index transcripts stored before search existed. Runs once per store;
+        afterwards the index is maintained by add().
+        """
+        with self._lock:
+            done = self._db.execute("SELECT value FROM meta WHERE key = 'search_index_built'").fetchone()
+            if done:
+                return
+            with self._db:
+                for transcript_id, body in self._db.execute("SELECT id, body FROM transcripts").fetchall():
+                    try:
+                        self._index(transcript_id, fernet.decrypt(body).decode())
+                    except Exception:
+                        continue
+                self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('search_index_built', '1')")
+
+    def page(self, offset=0, limit=TRANSCRIPT_PAGE_SIZE, query=""):
+        """
+        Newest-first metadata for one page of transcripts, preview decrypted.
+        With a `query`, only transcripts containing all of its words are listed.
+        """
+        where, params = "", []
+        terms = search_terms(query)
+        if terms:
+            where = "WHERE id IN ({}) ".format(" INTERSECT ".join(
+                ["SELECT transcript_id FROM search_postings WHERE term = ?"] * len(terms)))
+            params = [blind_term(term) for term in terms]
+        elif query.strip():
+            return []  # Only words too short to be indexed
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, name, created, duration, prompts_answered, prompts_total, preview "
+                "FROM transcripts " + where + "ORDER BY created DESC, id DESC LIMIT ? OFFSET ?",
+                params + [limit, offset]).fetchall()
+        keys = ("id", "name", "created", "duration", "prompts_answered", "prompts_total")
+        entries = []
+        for row in rows:
+            entry = dict(zip(keys, row))
+            try:
+                entry["preview"] = fernet.decrypt(row[-1]).decode()
+            except Exception:
+                entry["preview"] = ""
+            entries.append(entry)
+        return entries
+
+    def load(self, transcript_id):
+        with self._lock:
+            row = self._db.execute("SELECT body FROM transcripts WHERE id = ?", (transcript_id,)).fetchone()
+        if row is None:
+            return "Transcript not found."
+        try:
+            return fernet.decrypt(row[0]).decode()
+        except Exception:
+            return "Error decrypting file."
+
+    def set_prompt_status(self, transcript_id, answered, total):
+        with self._lock, self._db:
+            self._db.execute("UPDATE transcripts SET prompts_answered = ?, prompts_total = ? WHERE id = ?",
+                             (answered, total, transcript_id))
+
+    def migrate_legacy_files(self, transcripts_dir):
+        """
+        One-time import of the transcript_*.bin files used before the store.
+        The files are left where they are. Every file and the flag that stops
+        them from being imported again are written in one transaction, so an
+        interrupted import leaves nothing behind; names already in the store
+        are skipped as well. Returns the number imported.
+        """
+        with self._lock:
+            done = self._db.execute("SELECT value FROM meta WHERE key = 'legacy_files_migrated'").fetchone()
+        if done or not os.path.isdir(transcripts_dir):
+            return 0
+        legacy = []
+        for fname in sorted(os.listdir(transcripts_dir)):
+            if not (fname.startswith("transcript_") and fname.endswith(".bin")):
+                continue
+            path = os.path.join(transcripts_dir, fname)
+            name = fname[:-len(".bin")]
+            try:
+                created = datetime.datetime.strptime(name, "transcript_%Y%m%d_%H%M%S").timestamp()
+            except ValueError:
+                created = os.path.getmtime(path)
+            with open(path, "rb") as f:
+                body = f.read()
+            legacy.append((load_encrypted_transcript(path), created, name, body))
+        imported = 0
+        with self._lock, self._db:
+            existing = {name for name, in self._db.execute("SELECT name FROM transcripts")}
+            for transcript, created, name, body in legacy:
+                if name in existing:
+                    continue
+                # Keep the stored token as is; it only needs decrypting for the preview
+                self._insert(transcript, created=created, name=name, body=body)
+                imported += 1
+            self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('legacy_files_migrated', '1')")
+        return imported
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+# --- Audio Spooling ---
+SPOOL_BLOCK_FRAMES = 65536   # Frames per encrypted segment, and buffered in memory before each write
+PARTIAL_SUFFIX = ".part"     # Marks a session file that is still being recorded
+WAV_HEADER_SIZE = 44         # Canonical PCM header written by the wave module
+ENCRYPTED_AUDIO_EXT = ".osa"
+ENCRYPTED_AUDIO_MAGIC = b"OSAUDIO1"
+ENCRYPTED_AUDIO_VERSION = 1
+AUDIO_HEADER_FORMAT = struct.Struct("<8sHHHII16s")  # magic, version, channels, sample width, rate, segment frames, file id
+AUDIO_HEADER_INDEX = struct.Struct("<IQ")           # segments and frames written
+AUDIO_HEADER_MAC_BYTES = 16
+AUDIO_HEADER_SIZE = AUDIO_HEADER_FORMAT.size + AUDIO_HEADER_INDEX.size + AUDIO_HEADER_MAC_BYTES
+AUDIO_TAG_BYTES = 16         # AES-GCM tag appended to every segment
+
+class EncryptedAudioError(Exception):
+    pass
+
+def _audio_file_keys(file_id):
+    # Every file gets its own keys, so segment numbers can serve as nonces
+    keys = derive_key(audio_key, "audio file", length=64, salt=file_id)
+    return AESGCM(keys[:32]), keys[32:]
+
+def _audio_header_mac(mac_key, fixed, index):
+    return hmac.new(mac_key, fixed + index, hashlib.sha256).digest()[:AUDIO_HEADER_MAC_BYTES]
+
+class _SegmentedAudio:
+    """
+    Random access to the segments of an encrypted session file.
+
+    The file is a header followed by AES-GCM segments of `segment_frames`
+    frames each; only the last may be shorter. The header holds the audio
+    format and an index of how many segments and frames the file holds,
+    authenticated with an HMAC so the recording can't be silently
+    truncated. Because segments have a fixed size, the index is all that is
+    needed to seek to any frame. Each segment is sealed on its own with its
+    number as the nonce and, together with the header, as associated data,
+    so it decrypts independently but can't be reordered or moved to
+    another file.
+    """
+    def _segment_offset(self, i):
+        return AUDIO_HEADER_SIZE + i * (self.segment_frames * self.frame_size + AUDIO_TAG_BYTES)
+
+    def _segment_aad(self, i):
+        return self._fixed + struct.pack("<Q", i)
+
+    def _read_frames(self, start, count):
+        start = max(0, min(start, self.frames))
+        end = min(start + count, self.frames)
+        if end <= start:
+            return b""
+        first, last = start // self.segment_frames, (end - 1) // self.segment_frames
+        # Only the segments overlapping the range are read and decrypted
+        data = bytearray()
+        for i in range(first, last + 1):
+            size = min(self.segment_frames, self.frames - i * self.segment_frames) * self.frame_size
+            self._file.seek(self._segment_offset(i))
+            sealed = self._file.read(size + AUDIO_TAG_BYTES)
+            try:
+                data += self._aead.decrypt(struct.pack(">4xQ", i), sealed, self._segment_aad(i))
+            except Exception:
+                raise EncryptedAudioError(f"Segment {i} of {self.filename} failed to decrypt")
+        skip = (start - first * self.segment_frames) * self.frame_size
+        return bytes(data[skip:skip + (end - start) * self.frame_size])
+
+class EncryptedAudioWriter(_SegmentedAudio):
+    """
+    Encrypt PCM audio into a session file in fixed-size segments while it is captured.
+
+    Only one segment is ever held in memory. Each segment is synced to disk
+    before the header index is patched to include it, so a crash loses at
+    most the segment in flight and the header never counts data that isn't
+    there. The recording can be read back while it is still being written.
+    """
+    def __init__(self, filename, channels, sample_width, rate, segment_frames=SPOOL_BLOCK_FRAMES):
+        self.filename = filename
+        self.segment_frames = segment_frames
+        self.frame_size = channels * sample_width
+        self.frames_written = 0
+        self._segments = 0
+        self._block = bytearray()
+        file_id = os.urandom(16)
+        self._fixed = AUDIO_HEADER_FORMAT.pack(ENCRYPTED_AUDIO_MAGIC, ENCRYPTED_AUDIO_VERSION, channels,
+                                               sample_width, rate, segment_frames, file_id)
+        self._aead, self._mac_key = _audio_file_keys(file_id)
+        self._lock = threading.Lock()
+        self._file = open(filename, "w+b")
+        self._write_header()
+
+    @property
+    def frames(self):
+        return self.frames_written
+
+    def _write_header(self):
+        index = AUDIO_HEADER_INDEX.pack(self._segments, self.frames_written)
+        self._file.seek(0)
+        self._file.write(self._fixed + index + _audio_header_mac(self._mac_key, self._fixed, index))
+
+    def write(self, data):
+        # Accepts bytes or a contiguous NumPy array of samples
+        self._block += memoryview(data).cast("B")
+        segment_bytes = self.segment_frames * self.frame_size
+        while len(self._block) >= segment_bytes:
+            self._flush_segment(segment_bytes)
+
+    def _flush_segment(self, size):
+        size -= size % self.frame_size
+        if not size:
+            return
+        i = self._segments
+        sealed = self._aead.encrypt(struct.pack(">4xQ", i), bytes(self._block[:size]), self._segment_aad(i))
+        del self._block[:size]
+        with self._lock:
+            self._file.seek(self._segment_offset(i))
+            self._file.write(sealed)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._segments += 1
+            self.frames_written += size // self.frame_size
+            self._write_header()
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def read_window(self, start, length):
+        """Read samples [start, start + length) written so far, for a 16 kHz mono PCM16 session."""
+        with self._lock:
+            pcm = self._read_frames(start, length)
+        return pcm16_to_float32(np.frombuffer(pcm, dtype=np.int16))
+
+    def close(self):
+        # The final, shorter segment
+        self._flush_segment(len(self._block))
+        self._file.close()
+
+class EncryptedAudioReader(_SegmentedAudio):
+    """Read frames from an encrypted session file, decrypting only the segments needed."""
+    def __init__(self, filename):
+        self.filename = filename
+        self._file = open(filename, "rb")
+        try:
+            self._read_header()
+        except Exception:
+            self._file.close()
+            raise
+
+    def _read_header(self):
+        header = self._file.read(AUDIO_HEADER_SIZE)
+        if len(header) < AUDIO_HEADER_SIZE or not header.startswith(ENCRYPTED_AUDIO_MAGIC):
+            raise EncryptedAudioError(f"{self.filename} is not an encrypted audio file")
+        fixed = header[:AUDIO_HEADER_FORMAT.size]
+        index = header[AUDIO_HEADER_FORMAT.size:AUDIO_HEADER_FORMAT.size + AUDIO_HEADER_INDEX.size]
+        _, version, self.channels, self.sample_width, self.rate, self.segment_frames, file_id = \
+            AUDIO_HEADER_FORMAT.unpack(fixed)
+        if version != ENCRYPTED_AUDIO_VERSION:
+            raise EncryptedAudioError(f"Unsupported audio file version {version}")
+        self._fixed = fixed
+        self._aead, mac_key = _audio_file_keys(file_id)
+        if not hmac.compare_digest(header[-AUDIO_HEADER_MAC_BYTES:], _audio_header_mac(mac_key, fixed, index)):
+            raise EncryptedAudioError(f"Header of {self.filename} failed authentication")
+        self.segments, self.frames = AUDIO_HEADER_INDEX.unpack(index)
+        self.frame_size = self.channels * self.sample_width
+
+    def read_frames(self, start, count):
+        """Raw PCM for frames [start, start + count), clipped to the recording."""
+        return self._read_frames(start, count)
+
+    def data_size(self):
+        """Bytes of the file the header accounts for."""
+        return AUDIO_HEADER_SIZE + self.segments * AUDIO_TAG_BYTES + self.frames * self.frame_size
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def is_encrypted_audio(filename):
+    try:
+        with open(filename, "rb") as f:
+            return f.read(len(ENCRYPTED_AUDIO_MAGIC)) == ENCRYPTED_AUDIO_MAGIC
+    except OSError:
+        return False
+
+def repair_encrypted_audio(filename):
+    """Drop anything past the segments the header index accounts for."""
+    try:
+        with EncryptedAudioReader(filename) as reader:
+            size = reader.data_size()
+    except EncryptedAudioError:
+        return False
+    with open(filename, "r+b") as f:
+        f.truncate(size)
+    return True
+
+def repair_wav_header(filename):
+    """Rewrite the RIFF and data sizes of a WAV file from its length on disk."""
+    size = os.path.getsize(filename)
+    with open(filename, "r+b") as f:
+        header = f.read(WAV_HEADER_SIZE)
+        if len(header) < WAV_HEADER_SIZE or header[:4] != b"RIFF" or header[36:40] != b"data":
+            return False
+        channels, = struct.unpack("<H", header[22:24])
+        sample_width = struct.unpack("<H", header[34:36])[0] // 8
+        frame_size = max(1, channels * sample_width)
+        data_size = (size - WAV_HEADER_SIZE) // frame_size * frame_size
+        f.truncate(WAV_HEADER_SIZE + data_size)
+        f.seek(4)
+        f.write(struct.pack("<I", 36 + data_size))
+        f.seek(40)
+        f.write(struct.pack("<I", data_size))
+    return True
+
+def recover_partial_recordings(audio_dir):
+    """
+    Repair session files left behind by a crash during recording and give them
+    their final .wav name. Returns the list of recovered audio files.
+    """
+    recovered = []
+    if not os.path.isdir(audio_dir):
+        return recovered
+    for fname in sorted(os.listdir(audio_dir)):
+        if fname.endswith(ENCRYPTED_AUDIO_EXT + PARTIAL_SUFFIX):
+            header_size, repair = AUDIO_HEADER_SIZE, repair_encrypted_audio
+        elif fname.endswith(".wav" + PARTIAL_SUFFIX):
+            # Sessions recorded before audio was encrypted
+            header_size, repair = WAV_HEADER_SIZE, repair_wav_header
+        else:
+            continue
+        partial = os.path.join(audio_dir, fname)
+        try:
+            if os.path.getsize(partial) <= header_size:
+                # Nothing was captured before the crash
+                os.remove(partial)
+                continue
+            if not repair(partial):
+                print(f"Skipping unrecoverable recording: {partial}")
+                continue
+            final = partial[:-len(PARTIAL_SUFFIX)]
+            os.replace(partial, final)
+            recovered.append(final)
+        except OSError as e:
+            print(f"Error recovering {partial}: {e}")
+    return recovered
+
+# --- Audio Capture ---
+CAPTURE_BUFFER_SECONDS = 30  # Capacity of the capture ring buffer
+
+class RingBufferCapture:
+    """
+    PyAudio stream callback that copies input into a preallocated int16 ring.
+
+    The callback only performs a slice copy into the ring, so PortAudio's
+    thread never allocates per block or waits behind the transcription and
+    LLM threads. A consumer thread drains the ring with read_into().
+
+    Overruns are counted when PortAudio reports an input overflow and when the
+    consumer falls so far behind that unread samples are overwritten.
+    """
+    def __init__(self, rate, channels=1, seconds=CAPTURE_BUFFER_SECONDS):
+        self.capacity = int(rate * seconds) * channels
+        self._buffer = np.zeros(self.capacity, dtype=np.int16)
+        self._write_pos = 0  # Total samples written since start
+        self._read_pos = 0   # Total samples drained since start
+        self._lock = threading.Lock()
+        self._data_ready = threading.Event()
+        self.input_overflows = 0
+        self.ring_overruns = 0
+        self.dropped_samples = 0
+        # Resolved once so the real-time callback doesn't go through the lazy module
+        self._overflow_flag = pyaudio.paInputOverflow
+        self._continue = (None, pyaudio.paContinue)
+
+    @property
+    def overruns(self):
+        return self.input_overflows + self.ring_overruns
+
+    def callback(self, in_data, frame_count, time_info, status):
+        if status & self._overflow_flag:
+            self.input_overflows += 1
+        samples = np.frombuffer(in_data, dtype=np.int16)
+        n = min(samples.shape[0], self.capacity)
+        with self._lock:
+            start = self._write_pos % self.capacity
+            first = min(n, self.capacity - start)
+            self._buffer[start:start + first] = samples[:first]
+            self._buffer[:n - first] = samples[first:n]
+            self._write_pos += n
+            unread = self._write_pos - self._read_pos
+            if unread > self.capacity:
+                self.ring_overruns += 1
+                self.dropped_samples += unread - self.capacity
+                self._read_pos = self._write_pos - self.capacity
+        self._data_ready.set()
+        return self._continue
+
+    def wait(self, timeout=None):
+        """Block until the callback has delivered new samples."""
+        ready = self._data_ready.wait(timeout)
+        self._data_ready.clear()
+        return ready
+
+    def wake(self):
+        self._data_ready.set()
+
+    def read_into(self, out):
+        """Copy up to len(out) unread samples into out and return the count."""
+        with self._lock:
+            n = min(self._write_pos - self._read_pos, out.shape[0])
+            start = self._read_pos % self.capacity
+            first = min(n, self.capacity - start)
+            out[:first] = self._buffer[start:start + first]
+            out[first:n] = self._buffer[:n - first]
+            self._read_pos += n
+        return n
+
+# --- Resampling ---
+WHISPER_SAMPLE_RATE = 16000  # Whisper expects 16 kHz mono float32
+WHISPER_N_FFT = 400          # whisper.audio.N_FFT, kept here so importing doesn't load Whisper
+WHISPER_HOP_LENGTH = 160     # whisper.audio.HOP_LENGTH
+
+def pcm16_to_float32(pcm):
+    return pcm.astype(np.float32) / 32768.0
+
+def float32_to_pcm16(audio):
+    return np.clip(np.rint(audio * 32768.0), -32768, 32767).astype(np.int16)
+
+class PolyphaseResampler:
+    """
+    Streaming rational-ratio resampler using a Kaiser-windowed sinc filter.
+
+    The filter is split into one polyphase branch per output phase. Each
+    block is resampled with a single vectorized gather and dot product, and
+    the filter history carries over between blocks so audio can be converted
+    while it is being captured.
+    """
+    def __init__(self, in_rate, out_rate, half_width=10, beta=5.0):
+        g = math.gcd(int(in_rate), int(out_rate))
+        self.up = int(out_rate) // g
+        self.down = int(in_rate) // g
+        factor = max(self.up, self.down)
+        half_len = half_width * factor
+        n = np.arange(-half_len, half_len + 1)
+        h = np.sinc(n / factor) * np.kaiser(2 * half_len + 1, beta) * (self.up / factor)
+        self.taps = int(np.ceil(h.shape[0] / self.up))
+        h = np.pad(h, (0, self.taps * self.up - h.shape[0]))
+        # bank[p, j] = h[p + (taps - 1 - j) * up], reversed to line up with sliding windows
+        self._bank = np.ascontiguousarray(h.reshape(self.taps, self.up).T[:, ::-1], dtype=np.float32)
+        self.delay = half_len / self.down  # Group delay in output samples
+        self._history = np.zeros(self.taps - 1, dtype=np.float32)
+        self._consumed = 0   # Input samples consumed so far
+        self._next_t = 0     # Upsampled time index of the next output sample
+
+    def process(self, x):
+        """Resample the next block of float32 input and return the new output."""
+        xx = np.concatenate((self._history, np.asarray(x, dtype=np.float32)))
+        end = self._consumed + xx.shape[0] - self._history.shape[0]
+        count = max(0, -(-(end * self.up - self._next_t) // self.down))
+        t = self._next_t + self.down * np.arange(count, dtype=np.int64)
+        windows = np.lib.stride_tricks.sliding_window_view(xx, self.taps)[t // self.up - self._consumed]
+        out = np.einsum("ij,ij->i", windows, self._bank[t % self.up])
+        self._next_t += count * self.down
+        self._consumed = end
+        self._history = xx[xx.shape[0] - self._history.shape[0]:]
+        return out.astype(np.float32, copy=False)
+
+def resample_audio(audio, in_rate, out_rate=WHISPER_SAMPLE_RATE, block=1 << 18):
+    """Resample a whole float32 signal in process, compensating for filter delay."""
+    audio = np.asarray(audio, dtype=np.float32)
+    if in_rate == out_rate:
+        return audio
+    resampler = PolyphaseResampler(in_rate, out_rate)
+    parts = [resampler.process(audio[i:i + block]) for i in range(0, audio.shape[0], block)]
+    # Flush the filter tail so the last input samples reach the output
+    parts.append(resampler.process(np.zeros(resampler.taps + int(np.ceil(resampler.delay)), dtype=np.float32)))
+    out = np.concatenate(parts)
+    offset = int(round(resampler.delay))
+    n_out = -(-audio.shape[0] * resampler.up // resampler.down)
+    return out[offset:offset + n_out]
+
+def load_audio_16k(audio_file, start=0):
+    """
+    Load a recording as 16 kHz mono float32 without spawning ffmpeg.
+
+    Encrypted session files (everything the recorder writes) and PCM16
+    WAV files are decoded in process and resampled if needed; other
+    formats fall back to Whisper's ffmpeg-based loader. Samples before
+    `start` (at 16 kHz) are skipped, and for 16 kHz files they are never
+    read from disk or decrypted.
+    """
+    if is_encrypted_audio(audio_file):
+        with EncryptedAudioReader(audio_file) as reader:
+            channels = reader.channels
+            rate = reader.rate
+            skip = min(start, reader.frames) if rate == WHISPER_SAMPLE_RATE else 0
+            pcm = np.frombuffer(reader.read_frames(skip, reader.frames - skip), dtype=np.int16)
+    else:
+        try:
+            wf = wave.open(audio_file, "rb")
+        except (wave.Error, EOFError):
+            return whisper.load_audio(audio_file)[start:]
+        with wf:
+            if wf.getsampwidth() != 2:
+                return whisper.load_audio(audio_file)[start:]
+            channels = wf.getnchannels()
+            rate = wf.getframerate()
+            skip = 0
+            if rate == WHISPER_SAMPLE_RATE:
+                skip = min(start, wf.getnframes())
+                wf.setpos(skip)
+            pcm = np.frombuffer(wf.readframes(wf.getnframes() - skip), dtype=np.int16)
+    audio = pcm16_to_float32(pcm)
+    if channels > 1:
+        audio = audio[:audio.shape[0] // channels * channels].reshape(-1, channels).mean(axis=1)
+    return resample_audio(audio, rate, WHISPER_SAMPLE_RATE)[start - skip:]
+
+def read_audio_window(audio_file, start, length):
+    """
+    Read samples [start, start + length) of a 16 kHz mono PCM16 session file.
+    For encrypted files only the segments covering the window are decrypted.
+    """
+    if is_encrypted_audio(audio_file):
+        with EncryptedAudioReader(audio_file) as reader:
+            return pcm16_to_float32(np.frombuffer(reader.read_frames(start, length), dtype=np.int16))
+    with wave.open(audio_file, "rb") as wf:
+        start = min(start, wf.getnframes())
+        wf.setpos(start)
+        pcm = np.frombuffer(wf.readframes(length), dtype=np.int16)
+    return pcm16_to_float32(pcm)
+
+def encrypt_audio_file(source, audio_filename):
+    """
+    Decode any recording to 16 kHz mono and save it as an encrypted session
+    file, so imports are stored like everything the recorder writes and no
+    plaintext copy is kept. The file only gets its final name once complete.
+    Returns its length in seconds.
+    """
+    audio = load_audio_16k(source)
+    tmp = audio_filename + ".tmp"
+    writer = EncryptedAudioWriter(tmp, 1, 2, WHISPER_SAMPLE_RATE)
+    try:
+        for start in range(0, audio.shape[0], SPOOL_BLOCK_FRAMES):
+            writer.write(float32_to_pcm16(audio[start:start + SPOOL_BLOCK_FRAMES]))
+    finally:
+        writer.close()
+    os.replace(tmp, audio_filename)
+    return audio.shape[0] / WHISPER_SAMPLE_RATE
+
+def negotiate_capture_rate(audio, channels, fmt, fallback_rate):
+    """Prefer capturing at 16 kHz; otherwise use the device's native rate."""
+    try:
+        device = audio.get_default_input_device_info()
+    except (IOError, OSError):
+        return fallback_rate
+    try:
+        if audio.is_format_supported(WHISPER_SAMPLE_RATE, input_device=device["index"],
+                                     input_channels=channels, input_format=fmt):
+            return WHISPER_SAMPLE_RATE
+    except ValueError:
+        pass
+    return int(device.get("defaultSampleRate") or fallback_rate)
+
+# --- Session Audio Handoff ---
+HANDOFF_MAX_SECONDS = 60 * 60  # Longest session kept in memory (~230 MB of float32)
+TRANSCRIBE_SPAN_SAMPLES = HANDOFF_MAX_SECONDS * WHISPER_SAMPLE_RATE  # Most audio read back from a session file at once
+
+class SessionAudioBuffer:
+    """
+    16 kHz float32 copy of the session, filled by the recorder as it drains.
+
+    The transcriber receives view(), a NumPy view over the same memory, so
+    nothing is re-read from disk or copied at stop. Capacity is reserved up
+    front, but pages are only touched as audio arrives. Sessions longer than
+    max_seconds mark the buffer as overflowed and are transcribed from the
+    archived file.
+    """
+    def __init__(self, max_seconds=HANDOFF_MAX_SECONDS, rate=WHISPER_SAMPLE_RATE):
+        self.capacity = int(max_seconds * rate)
+        self.length = 0
+        self.overflowed = False
+        self._array = np.empty(self.capacity, dtype=np.float32)
+
+    def append(self, samples):
+        n = samples.shape[0]
+        if self.overflowed or self.length + n > self.capacity:
+            self.overflowed = True
+            return False
+        self._array[self.length:self.length + n] = samples
+        self.length += n
+        return True
+
+    def view(self, start=0, end=None):
+        end = self.length if end is None else min(end, self.length)
+        return self._array[start:end]
+
+    def close(self):
+        self._array = None
+
+# --- Model Manager ---
+class _ModelEntry:
+    def __init__(self):
+        self.model = None
+        self.error = None
+        self.loaded = threading.Event()
+        self.inference_lock = threading.Lock()
+
+class ModelManager:
+    """
+    Process-wide owner of the Whisper and LLM models.
+
+    Loading is single-flight: callers asking for a model that is already
+    loading wait for that load instead of starting a second copy. A loaded
+    model stays loaded for the life of the process, so warm-up pays the
+    load once. Each model has an inference lock that use() holds for the
+    duration of a with-block, so one inference runs per model at a time.
+    """
+    def __init__(self):
+        self._loaders = {}
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, loader):
+        self._loaders[name] = loader
+
+    def acquire(self, name):
+        """Return the model, loading it on first use."""
+        with self._lock:
+            entry = self._entries.get(name)
+            owner = entry is None
+            if owner:
+                entry = self._entries[name] = _ModelEntry()
+        if owner:
+            try:
+                entry.model = self._loaders[name]()
+            except BaseException as e:
+                entry.error = e
+                with self._lock:
+                    # Forget the failed load so a later call can retry
+                    self._entries.pop(name, None)
+                raise
+            finally:
+                entry.loaded.set()
+        else:
+            entry.loaded.wait()
+            if entry.error is not None:
+                raise entry.error
+        return entry.model
+
+    @contextlib.contextmanager
+    def use(self, name):
+        """Hold the model's inference lock for a with-block."""
+        model = self.acquire(name)
+        with self._entries[name].inference_lock:
+            yield model
+
+model_manager = ModelManager()
+WHISPER_MODEL = "whisper"
+LLM_MODEL = "llm"
+
+# --- CPU Scheduling ---
+WHISPER_CPU_SHARE = 0.5  # Fraction of cores transcription gets while the LLM is also busy
+
+def _cgroup_cpu_limit():
+    """CPUs allowed by a cgroup quota (v2 or v1), or None when unlimited."""
+    try:
+        with open("/sys/fs/cgroup/cpu.max", "r") as f:
+            quota, period = f.read().split()[:2]
+        if quota != "max":
+            return max(1, math.ceil(int(quota) / int(period)))
+        return None
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us", "r") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us", "r") as f:
+            period = int(f.read())
+        if quota > 0 and period > 0:
+            return max(1, math.ceil(quota / period))
+    except (OSError, ValueError):
+        pass
+    return None
+
+def _physical_cores(cpus):
+    """Distinct physical cores among the logical `cpus`, or None if unknown."""
+    cores = set()
+    for cpu in cpus:
+        base = f"/sys/devices/system/cpu/cpu{cpu}/topology"
+        try:
+            with open(os.path.join(base, "physical_package_id"), "r") as f:
+                package = f.read().strip()
+            with open(os.path.join(base, "core_id"), "r") as f:
+                cores.add((package, f.read().strip()))
+        except OSError:
+            break
+    else:
+        return len(cores) or None
+    if sys.platform == "darwin":
+        try:
+            import subprocess
+            out = subprocess.run(["sysctl", "-n", "hw.physicalcpu"],
+                                 capture_output=True, text=True, timeout=2).stdout
+            return int(out)
+        except (OSError, ValueError, subprocess.SubprocessError):
+            pass
+    return None
+
+def detect_cpu_topology():
+    """
+    Cores this process can actually use: the CPUs in its affinity mask,
+    counted once per physical core (hyperthread siblings share the matmul
+    units both workloads saturate), capped by any cgroup CPU quota.
+    Returns a dict with the logical, physical and usable counts.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        cpus = sorted(os.sched_getaffinity(0))
+    else:
+        cpus = list(range(os.cpu_count() or 1))
+    physical = _physical_cores(cpus) or len(cpus)
+    quota = _cgroup_cpu_limit()
+    usable = max(1, min(physical, len(cpus), quota or len(cpus)))
+    return {"logical": len(cpus), "physical": physical, "cgroup_limit": quota, "usable": usable}
+
+class CPUScheduler:
+    """
+    Split the usable cores between transcription and the LLM.
+
+    Each workload marks itself busy with running(), which yields the
+    thread count it should use right now: every core while it runs alone,
+    or its share while the other is also busy. Counts are taken at the
+    start of each inference call, so a workload starting mid-call is
+    accommodated from the next call on. Setting share_cores to False
+    gives every workload all cores, as before; the benchmark uses it as
+    the baseline. The topology is detected on first use, not at import.
+    """
+    def __init__(self, whisper_share=WHISPER_CPU_SHARE):
+        self.whisper_share = whisper_share
+        self.share_cores = True
+        self._topology = None
+        self._cores = None
+        self._lock = threading.Lock()
+        self._active = {WHISPER_MODEL: 0, LLM_MODEL: 0}
+
+    @property
+    def topology(self):
+        if self._topology is None:
+            self._topology = detect_cpu_topology()
+        return self._topology
+
+    @property
+    def cores(self):
+        return self._cores or self.topology["usable"]
+
+    @cores.setter
+    def cores(self, cores):
+        # Transcription pool workers are limited to their slice of the cores
+        self._cores = cores
+
+    def threads_for(self, workload):
+        with self._lock:
+            others_busy = any(count for name, count in self._active.items() if name != workload)
+        if not self.share_cores or not others_busy or self.cores < 2:
+            return self.cores
+        whisper = min(self.cores - 1, max(1, round(self.cores * self.whisper_share)))
+        return whisper if workload == WHISPER_MODEL else self.cores - whisper
+
+    @contextlib.contextmanager
+    def running(self, workload):
+        """Mark `workload` busy for a with-block; yields its thread count."""
+        with self._lock:
+            self._active[workload] += 1
+        try:
+            yield self.threads_for(workload)
+        finally:
+            with self._lock:
+                self._active[workload] -= 1
+
+cpu_scheduler = CPUScheduler()
+
 # --- Dummy AI Functions ---
+WHISPER_MODEL_NAME = "base"
+WHISPER_N_MELS = 80  # Mel bins expected by WHISPER_MODEL_NAME
+WINDOW_SECONDS = 30  # Whisper decodes audio in fixed 30-second windows
+WINDOW_SAMPLES = WINDOW_SECONDS * WHISPER_SAMPLE_RATE
+TRANSCRIBE_BATCH_SIZE = 4  # Windows decoded per whisper.decode call
+
+def load_whisper_model():
+    return whisper.load_model(WHISPER_MODEL_NAME)
+
+model_manager.register(WHISPER_MODEL, load_whisper_model)
+
 def transcribe_audio(audio_file):
-    # Load the Whisper model only once and cache it as a function attribute.
-    if not hasattr(transcribe_audio, "model"):
-        transcribe_audio.model = whisper.load_model("base")
-    result = transcribe_audio.model.transcribe(audio_file)
+    with model_manager.use(WHISPER_MODEL) as model, cpu_scheduler.running(WHISPER_MODEL) as threads:
+        torch.set_num_threads(threads)
+        result = model.transcribe(audio_file)
     return result["text"]
 
-def summarize_text(text):
+def decode_audio_window(audio_chunk):
+    """Decode one window of 16 kHz audio, zero-padding it to 30 seconds."""
+    return decode_audio_windows([audio_chunk])[0]
+
+def decode_audio_windows(audio_chunks):
+    """Decode several windows of 16 kHz audio with one batched decode call."""
+    mels = [compute_session_mel(audio_chunk) for audio_chunk in audio_chunks]
+    return decode_mel_windows(torch.stack(mels))
+
+def decode_mel_windows(mel_batch):
+    """
+    Decode a (windows, n_mels, 3000) batch of log-mel frames with whisper.decode.
+
+    Batching 4-8 windows keeps the encoder and decoder matmuls large enough
+    to use all CPU cores. Returns one text per window, in order.
+    """
+    with model_manager.use(WHISPER_MODEL) as model, cpu_scheduler.running(WHISPER_MODEL) as threads:
+        torch.set_num_threads(threads)
+        # fp16 is only supported when the model runs on a GPU
+        options = whisper.DecodingOptions(fp16=model.device.type != "cpu")
+        results = whisper.decode(model, mel_batch.to(model.device), options)
+    return [result.text for result in results]
+
+# --- Log-Mel Precomputation ---
+WINDOW_FRAMES = WINDOW_SAMPLES // WHISPER_HOP_LENGTH  # 3000 mel frames per window
+MEL_BLOCK_WINDOWS = 8  # Windows per STFT block; bounds the complex STFT scratch memory
+
+def compute_session_mel(audio, n_mels=WHISPER_N_MELS, block_windows=MEL_BLOCK_WINDOWS):
+    """
+    Log-mel spectrogram of a whole recording, zero-padded to whole windows.
+
+    Matches whisper.log_mel_spectrogram(audio, padding=...) over the entire
+    session, including its single global dynamic-range clamp, without first
+    building a padded copy of the audio. The STFT runs block by block so its
+    complex scratch never spans more than `block_windows` windows. Frame f
+    covers the audio around sample f * HOP_LENGTH.
+    """
+    n_fft, hop = WHISPER_N_FFT, WHISPER_HOP_LENGTH
+    if audio.shape[0] == 0:
+        audio = np.zeros(1, dtype=np.float32)
+    n_windows = -(-audio.shape[0] // WINDOW_SAMPLES)
+    padded_length = n_windows * WINDOW_SAMPLES
+    n_frames = padded_length // hop
+    filters = whisper.audio.mel_filters("cpu", n_mels)
+    stft_window = torch.hann_window(n_fft)
+    mel = torch.empty((n_mels, n_frames), dtype=torch.float32)
+    block_frames = block_windows * WINDOW_FRAMES
+    for f0 in range(0, n_frames, block_frames):
+        f1 = min(f0 + block_frames, n_frames)
+        # Gather the samples frames [f0, f1) see in the zero-padded, reflect-padded
+        # signal that torch.stft(center=True) would build for the whole session
+        idx = np.abs(np.arange(f0 * hop - n_fft // 2, (f1 - 1) * hop + n_fft // 2))
+        idx = np.where(idx >= padded_length, 2 * (padded_length - 1) - idx, idx)
+        segment = np.where(idx < audio.shape[0], audio[np.minimum(idx, audio.shape[0] - 1)], 0)
+        stft = torch.stft(torch.from_numpy(segment.astype(np.float32)), n_fft, hop,
+                          window=stft_window, center=False, return_complex=True)
+        magnitudes = stft.abs() ** 2
+        mel[:, f0:f1] = torch.clamp(filters @ magnitudes, min=1e-10).log10()
+    mel.clamp_(min=mel.max().item() - 8.0).add_(4.0).div_(4.0)
+    return mel
+
+def mel_window_batch(mel, offset, windows, pad_value):
+    """
+    Gather (start, end) sample windows from a mel that begins at sample `offset`.
+
+    Returns a (k, n_mels, 3000) tensor. Full-length consecutive windows are
+    a reshaped view of the mel, so nothing is copied. Frames past a shorter
+    window's end are filled with `pad_value`, the level of digital silence,
+    so audio outside the window never leaks into its decode.
+    """
+    hop = WHISPER_HOP_LENGTH
+    n_mels, n_frames = mel.shape
+    first = (windows[0][0] - offset) // hop
+    k = len(windows)
+    contiguous = all(end - start == WINDOW_SAMPLES for start, end in windows) and \
+        all(windows[j + 1][0] == windows[j][1] for j in range(k - 1))
+    if contiguous and first + k * WINDOW_FRAMES <= n_frames:
+        frames = mel[:, first:first + k * WINDOW_FRAMES]
+        return frames.reshape(n_mels, k, WINDOW_FRAMES).transpose(0, 1)
+    batch = torch.full((k, n_mels, WINDOW_FRAMES), pad_value, dtype=mel.dtype)
+    for j, (start, end) in enumerate(windows):
+        f0 = (start - offset) // hop
+        count = min(-(-(end - start) // hop), WINDOW_FRAMES, n_frames - f0)
+        batch[j, :, :count] = mel[:, f0:f0 + count]
+    return batch
+
+def iter_decode_mel_windows(mel, offset, windows, batch_size=TRANSCRIBE_BATCH_SIZE):
+    """
+    Decode indexed (j, start, end) windows from a precomputed mel in batches.
+
+    Yields (j, text) in the order given.
+    """
+    # Normalized log-mel spans 2.0 from its peak down to the silence floor
+    pad_value = mel.max().item() - 2.0
+    windows = list(windows)
+    for b in range(0, len(windows), batch_size):
+        batch = windows[b:b + batch_size]
+        mel_batch = mel_window_batch(mel, offset, [(start, end) for _, start, end in batch], pad_value)
+        yield from zip([j for j, _, _ in batch], decode_mel_windows(mel_batch))
+
+def iter_transcribe_chunks(audio, offset, windows, batch_size=TRANSCRIBE_BATCH_SIZE):
+    """
+    Decode (start, end) sample windows in batches, yielding (index, text) in order.
+
+    `audio` holds the recording from sample `offset` on, and windows are
+    given in absolute samples. The mel is computed once up front.
+    """
+    mel = compute_session_mel(audio)
+    indexed = [(j, start, end) for j, (start, end) in enumerate(windows)]
+    yield from iter_decode_mel_windows(mel, offset, indexed, batch_size)
+
+# --- Voice Activity Detection ---
+VAD_ENABLED = True
+VAD_FRAME_SECONDS = 0.03       # Analysis frame length
+VAD_MARGIN_DB = 3.0            # Speech must stand this far above the noise floor
+VAD_MIN_LEVEL_DB = -50.0       # ...and above this absolute level (dBFS)
+VAD_MIN_SPEECH_SECONDS = 0.2   # Shorter bursts are treated as clicks
+VAD_HANGOVER_SECONDS = 0.5     # Context kept on both sides of speech
+VAD_FALLBACK_SPREAD_DB = 6.0   # Frame levels varying this much (10th to 90th percentile) aren't steady noise
+
+def frame_energy_db(audio, sr=WHISPER_SAMPLE_RATE):
+    """Energy of each VAD_FRAME_SECONDS frame of `audio`, in dBFS."""
+    frame = int(sr * VAD_FRAME_SECONDS)
+    n = audio.shape[0] // frame
+    frames = audio[:n * frame].reshape(n, frame)
+    return 10.0 * np.log10(np.einsum("ij,ij->i", frames, frames) / frame + 1e-10)
+
+def detect_speech(audio, sr=WHISPER_SAMPLE_RATE):
+    """
+    Return the (start, end) sample ranges of `audio` that contain speech.
+
+    Frame energies are compared against an adaptive noise floor (the 10th
+    percentile of the recording) plus a margin. Short bursts are dropped and
+    the surviving regions are widened by a hangover, so word onsets and
+    trailing syllables are kept. The margin is kept small: speech only a few
+    dB above steady background noise is still speech Whisper can decode.
+    """
+    frame = int(sr * VAD_FRAME_SECONDS)
+    energy_db = frame_energy_db(audio, sr)
+    n = energy_db.shape[0]
+    if n == 0:
+        return []
+    threshold = max(np.percentile(energy_db, 10) + VAD_MARGIN_DB, VAD_MIN_LEVEL_DB)
+    active = energy_db > threshold
+    # Run boundaries of the raw activity mask
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], active.view(np.int8), [0]))))
+    starts, ends = edges[0::2], edges[1::2]
+    keep = (ends - starts) >= int(np.ceil(VAD_MIN_SPEECH_SECONDS / VAD_FRAME_SECONDS))
+    hang = int(np.ceil(VAD_HANGOVER_SECONDS / VAD_FRAME_SECONDS))
+    regions = []
+    for start, end in zip(np.maximum(starts[keep] - hang, 0), np.minimum(ends[keep] + hang, n)):
+        if regions and start <= regions[-1][1]:
+            regions[-1][1] = end
+        else:
+            regions.append([start, end])
+    return [(int(start) * frame, min(int(end) * frame, audio.shape[0])) for start, end in regions]
+
+def pack_speech_windows(regions, window=WINDOW_SAMPLES):
+    """
+    Pack speech regions into windows no longer than `window` samples.
+
+    Consecutive regions share a window while they fit, the silence between
+    them included; a region longer than a window is split at window length.
+    """
+    windows = []
+    current = None
+    for start, end in regions:
+        if current is not None and end - current[0] <= window:
+            current[1] = end
+            continue
+        if current is not None:
+            windows.append(tuple(current))
+        while end - start > window:
+            windows.append((start, start + window))
+            start += window
+        current = [start, end]
+    if current is not None:
+        windows.append(tuple(current))
+    return windows
+
+def may_hold_missed_speech(audio):
+    """
+    Whether `audio`, in which detect_speech found nothing, should still be
+    decoded: it is above VAD_MIN_LEVEL_DB and its level varies the way
+    speech does. A flat noise floor (room tone, HVAC) never qualifies.
+    """
+    energy_db = frame_energy_db(audio)
+    if energy_db.shape[0] == 0:
+        return False
+    low, high = np.percentile(energy_db, [10, 90])
+    return high > VAD_MIN_LEVEL_DB and high - low > VAD_FALLBACK_SPREAD_DB
+
+def plan_windows(audio, offset, vad=VAD_ENABLED):
+    """
+    Choose the windows to decode for `audio`, which starts at sample `offset`.
+
+    Without VAD this is the fixed 30-second grid. With VAD, silent stretches
+    are skipped and speech is packed into windows. Ranges are absolute.
+
+    If VAD finds no speech in audio whose level still varies like speech
+    (a recording that is speech throughout, so the noise floor estimate is
+    speech itself), the fixed grid is decoded rather than nothing. Steady
+    noise is skipped however loud it is.
+    """
+    local = None
+    if vad:
+        local = pack_speech_windows(detect_speech(audio))
+        if not local and may_hold_missed_speech(audio):
+            local = None
+    if local is None:
+        local = [(start, min(start + WINDOW_SAMPLES, audio.shape[0]))
+                 for start in range(0, audio.shape[0], WINDOW_SAMPLES)]
+    return [(offset + start, offset + end) for start, end in local]
+
+# --- Transcription Journal ---
+JOURNAL_SUFFIX = ".journal"
+JOURNAL_SYNC_RECORDS = 8     # fsync after this many records...
+JOURNAL_SYNC_SECONDS = 5.0   # ...or once this long has passed since the last sync
+
+def read_legacy_state(state_file):
+    """Return (samples already transcribed, transcript so far) from an old .state file."""
+    with open(state_file, 'r') as f:
+        state = json.load(f)
+    if "processed_samples" in state:
+        processed = state["processed_samples"]
+    else:
+        # The oldest state files count fixed 30-second chunks
+        processed = (state.get("last_processed_chunk", -1) + 1) * WINDOW_SAMPLES
+    return processed, state.get("transcript", "")
+
+class TranscriptionJournal:
     """
-    Summarize text using a local Mistral 7B model via ctransformers.
+    Append-only, encrypted log of the windows transcribed for one recording.
+
+    Every processed window appends one Fernet token line holding the
+    sample where the window ends and its text, so the cost per window is
+    constant no matter how far into the session we are. Records are synced
+    to disk in groups; a crash loses at most the records since the last
+    sync, and those windows are simply decoded again. Resume replays the
+    journal to rebuild the transcript and the position to continue from.
     """
-    if not hasattr(summarize_text, "model"):
-        summarize_text.model = AutoModelForCausalLM.from_pretrained(
-            MODEL_REPO,
-            model_file=MODEL_FILENAME,
+    def __init__(self, audio_file):
+        self.audio_file = audio_file
+        self.path = audio_file + JOURNAL_SUFFIX
+        self._file = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def replay(self):
+        """Return (samples already transcribed, transcript so far)."""
+        legacy_state = self.audio_file + '.state'
+        if not os.path.exists(self.path) and os.path.exists(legacy_state):
+            # Move plaintext progress from the old .state format into the journal
+            processed, transcript = read_legacy_state(legacy_state)
+            self.append(processed, transcript.strip())
+            self.sync()
+            os.remove(legacy_state)
+        processed, transcript = 0, ""
+        if not os.path.exists(self.path):
+            return processed, transcript
+        with open(self.path, "r+b") as f:
+            intact = 0
+            for line in f:
+                try:
+                    record = json.loads(fernet.decrypt(line.strip()))
+                except Exception:
+                    # Torn final record from a crash; drop it so new records
+                    # start on a clean line. Everything before it is intact.
+                    f.truncate(intact)
+                    break
+                intact += len(line)
+                processed = record["end"]
+                if "text" in record:
+                    transcript += record["text"] + " "
+        return processed, transcript
+
+    def append(self, end_sample, text=None):
+        """Record that audio up to end_sample is done; text is None for skipped audio."""
+        record = {"end": int(end_sample)}
+        if text is not None:
+            record["text"] = text
+        if self._file is None:
+            self._file = open(self.path, "ab")
+        self._file.write(fernet.encrypt(json.dumps(record).encode()) + b"\n")
+        self._file.flush()
+        self._unsynced += 1
+        if self._unsynced >= JOURNAL_SYNC_RECORDS or time.monotonic() - self._last_sync >= JOURNAL_SYNC_SECONDS:
+            self.sync()
+
+    def sync(self):
+        if self._file is not None and self._unsynced:
+            os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+    def remove(self):
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+# --- Parallel Transcription ---
+PARALLEL_MIN_CHUNKS = 20         # Below this (10 minutes) a process pool costs more than it saves
+PARALLEL_THREADS_PER_WORKER = 2  # Torch threads given to each worker process
+PARALLEL_MAX_WORKERS = 16        # Each worker holds its own Whisper model in memory
+
+def parallel_worker_count(cores=None):
+    cores = cores or cpu_scheduler.cores
+    return max(1, min(PARALLEL_MAX_WORKERS, cores // PARALLEL_THREADS_PER_WORKER))
+
+def _init_transcription_worker(threads):
+    cpu_scheduler.cores = threads
+    torch.set_num_threads(threads)
+    # Load this worker's model before its first batch arrives
+    model_manager.acquire(WHISPER_MODEL)
+
+class SharedMel:
+    """A log-mel spectrogram copied into shared memory, for pool workers to attach to by name."""
+    def __init__(self, mel):
+        self.shape = tuple(mel.shape)
+        self._shm = shared_memory.SharedMemory(create=True, size=max(mel.numel() * 4, 1))
+        np.ndarray(self.shape, dtype=np.float32, buffer=self._shm.buf)[...] = mel.numpy()
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    def close(self):
+        self._shm.close()
+        self._shm.unlink()
+
+def attach_shared_mel(name, shape):
+    """Returns (shm, mel tensor) for a SharedMel; keep shm alive for as long as mel is used."""
+    shm = shared_memory.SharedMemory(name=name)
+    # The creating process owns the segment; don't let this process's
+    # resource tracker unlink it on exit.
+    try:
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+    return shm, torch.from_numpy(np.ndarray(shape, dtype=np.float32, buffer=shm.buf))
+
+def _transcribe_chunks_in_worker(shm_name, shape, offset, windows, batch_size):
+    shm, mel = attach_shared_mel(shm_name, shape)
+    try:
+        return list(iter_decode_mel_windows(mel, offset, windows, batch_size))
+    finally:
+        mel = None
+        try:
+            shm.close()
+        except BufferError:
+            pass
+
+def iter_transcribe_chunks_parallel(audio, offset, windows, batch_size=TRANSCRIBE_BATCH_SIZE,
+                                    workers=None):
+    """
+    Decode windows across a pool of processes, one Whisper model per worker.
+
+    The session's log-mel is computed once and copied into shared memory
+    that every worker attaches to, so only window bounds and result texts
+    cross process boundaries. Yields (index, text) as batches complete,
+    which may be out of order.
+    """
+    with cpu_scheduler.running(WHISPER_MODEL) as cores:
+        yield from _transcribe_in_pool(audio, offset, windows, batch_size,
+                                       workers or parallel_worker_count(cores), cores)
+
+def _transcribe_in_pool(audio, offset, windows, batch_size, workers, cores):
+    threads = max(1, cores // workers)
+    shared = SharedMel(compute_session_mel(audio))
+    indexed = [(j, start, end) for j, (start, end) in enumerate(windows)]
+    try:
+        with ProcessPoolExecutor(max_workers=workers,
+                                 mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_transcription_worker,
+                                 initargs=(threads,)) as pool:
+            futures = [
+                pool.submit(_transcribe_chunks_in_worker, shared.name, shared.shape,
+                            offset, indexed[b:b + batch_size], batch_size)
+                for b in range(0, len(indexed), batch_size)
+            ]
+            for future in as_completed(futures):
+                yield from future.result()
+    finally:
+        shared.close()
+
+# --- Transcription Queue ---
+TRANSCRIPTION_WORKERS = 1          # Each transcription already uses every core it is given
+QUEUE_MANIFEST = "transcription_queue.bin"
+DEFAULT_REALTIME_FACTOR = 0.25     # Seconds of work per second of audio, until measured
+
+def audio_duration(audio_file):
+    """Length in seconds from a WAV or encrypted audio header, or None for other formats."""
+    if is_encrypted_audio(audio_file):
+        try:
+            with EncryptedAudioReader(audio_file) as reader:
+                return reader.frames / reader.rate
+        except (EncryptedAudioError, OSError):
+            return None
+    try:
+        with wave.open(audio_file, "rb") as wf:
+            return wf.getnframes() / wf.getframerate()
+    except (wave.Error, EOFError, OSError):
+        return None
+
+def pending_recordings(audio_dir, queued=()):
+    """
+    Recordings in `audio_dir` that still need transcribing, in the order to
+    run them: the `queued` file names first, then sessions recovered from a
+    crash mid-recording, then any recording whose journal or legacy .state
+    file shows it was interrupted mid-transcription.
+    """
+    recovered = recover_partial_recordings(audio_dir)
+    pending = [os.path.join(audio_dir, name) for name in queued]
+    pending += recovered
+    if os.path.isdir(audio_dir):
+        for fname in sorted(os.listdir(audio_dir)):
+            for suffix in (JOURNAL_SUFFIX, ".state"):
+                if fname.endswith(suffix):
+                    pending.append(os.path.join(audio_dir, fname[:-len(suffix)]))
+    # Keep the first mention of each file that still exists
+    return [f for f in dict.fromkeys(pending) if os.path.isfile(f)]
+
+class TranscriptionJob:
+    def __init__(self, audio_file, options, duration=None):
+        self.audio_file = audio_file
+        self.options = options  # Passed through to the runner, e.g. in-memory session audio
+        # Seconds of audio; the runner may fill it in once decoded, for formats without a header
+        self.duration = duration or audio_duration(audio_file)
+        self.progress = 0.0
+        self.first_progress = None  # Where this run started, for resumed recordings
+        self.running = False
+
+class TranscriptionQueue:
+    """
+    Durable FIFO of recordings to transcribe, run by a bounded number of
+    worker threads so back-to-back sessions don't compete for the CPU.
+
+    The queued file names are kept in an encrypted manifest in the audio
+    folder, rewritten whenever the queue changes, and each recording's
+    journal keeps its progress. After a restart, resume() re-queues the
+    manifest plus anything pending_recordings() finds. Each job runs as
+    run(job, report_progress), where report_progress takes the fraction
+    done. on_change() is called from any thread whenever the depth or ETA
+    may have changed.
+
+    A job that raises stays in the manifest, so it is retried on the next
+    start even if it failed before writing any journal, and on_error(audio
+    file, exception) is called from the worker thread.
+    """
+    def __init__(self, audio_dir, run, workers=TRANSCRIPTION_WORKERS, on_change=None, on_error=None):
+        self.audio_dir = audio_dir
+        self.manifest = os.path.join(audio_dir, QUEUE_MANIFEST)
+        self.run = run
+        self.workers = workers
+        self.on_change = on_change
+        self.on_error = on_error
+        self.realtime_factor = DEFAULT_REALTIME_FACTOR
+        self._jobs = []  # Queued and running, oldest first
+        self._failed = []  # Files that failed this run; kept in the manifest for the next
+        self._threads = []
+        self._cond = threading.Condition()
+
+    def _read_manifest(self):
+        try:
+            with open(self.manifest, "rb") as f:
+                return json.loads(fernet.decrypt(f.read()))
+        except FileNotFoundError:
+            return []
+        except Exception as e:
+            print("Ignoring unreadable transcription queue:", e)
+            return []
+
+    def _write_manifest(self):
+        names = [os.path.basename(job.audio_file) for job in self._jobs]
+        names += [os.path.basename(audio_file) for audio_file in self._failed]
+        tmp = self.manifest + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(fernet.encrypt(json.dumps(names).encode()))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.manifest)
+
+    def resume(self):
+        """Queue every recording left unfinished by an earlier run; returns them."""
+        pending = pending_recordings(self.audio_dir, self._read_manifest())
+        for audio_file in pending:
+            self.submit(audio_file)
+        return pending
+
+    def submit(self, audio_file, duration=None, **options):
+        """Queue a recording; pass `duration` when its file isn't readable yet."""
+        with self._cond:
+            if any(job.audio_file == audio_file for job in self._jobs):
+                return
+            if audio_file in self._failed:
+                self._failed.remove(audio_file)
+            self._jobs.append(TranscriptionJob(audio_file, options, duration))
+            self._write_manifest()
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, daemon=True)
+                self._threads.append(thread)
+                thread.start()
+            self._cond.notify()
+        self._changed()
+
+    def status(self):
+        """(recordings queued or running, estimated seconds until all are done or None)."""
+        with self._cond:
+            jobs = list(self._jobs)
+        if not jobs:
+            return 0, None
+        known = [job.duration for job in jobs if job.duration]
+        typical = sum(known) / len(known) if known else None
+        if typical is None:
+            return len(jobs), None
+        remaining = sum((job.duration or typical) * (1 - job.progress) for job in jobs)
+        return len(jobs), remaining * self.realtime_factor / self.workers
+
+    def _changed(self):
+        if self.on_change is not None:
+            self.on_change()
+
+    def _next_job(self):
+        with self._cond:
+            while True:
+                for job in self._jobs:
+                    if not job.running:
+                        job.running = True
+                        return job
+                self._cond.wait()
+
+    def _work(self):
+        while True:
+            job = self._next_job()
+            self._changed()
+            start = time.monotonic()
+
+            def _report_progress(fraction, job=job):
+                if job.first_progress is None:
+                    job.first_progress = fraction
+                job.progress = fraction
+                self._changed()
+
+            error = None
+            try:
+                self.run(job, _report_progress)
+                done = job.progress - (job.first_progress or 0.0)
+                if job.duration and done > 0.05:
+                    # Smooth the measured speed into the estimate
+                    measured = (time.monotonic() - start) / (job.duration * done)
+                    self.realtime_factor = 0.7 * self.realtime_factor + 0.3 * measured
+            except Exception as e:
+                print(f"Transcription of {job.audio_file} failed:", e)
+                error = e
+            with self._cond:
+                self._jobs.remove(job)
+                if error is not None:
+                    # Stays in the manifest, so the next start tries again
+                    self._failed.append(job.audio_file)
+                self._write_manifest()
+            self._changed()
+            if error is not None and self.on_error is not None:
+                self.on_error(job.audio_file, error)
+
+# --- LLM Backends ---
+LLM_THREADS = 8
+LLM_CONTEXT_TOKENS = 8192  # Room for a long session transcript plus the answer
+LLM_BATCH_TOKENS = 512     # Prompt tokens evaluated per forward pass
+LLM_BACKEND = "auto"       # "auto", "llama.cpp" or "ctransformers"
+LLM_BACKEND_FILE = os.path.join(MODELS_DIR, "llm_backend.json")  # Calibration result
+CALIBRATION_PROMPT = "Summarize the following text concisely:\nThe patient reports sleeping better since the last visit.\nSummary:"
+CALIBRATION_TOKENS = 32
+STREAM_UPDATE_INTERVAL = 0.1  # Seconds between partial-text callbacks while streaming
+# Passed explicitly so both backends sample alike and the result cache can key on them
+LLM_SAMPLING = {"temperature": 0.8, "top_k": 40, "top_p": 0.95, "repeat_penalty": 1.1}
+
+class LLMBackend:
+    """
+    A loaded GGUF model behind one interface, whatever library runs it.
+
+    Weights are memory-mapped rather than read into private memory, so
+    loading is fast once the file is in the page cache, and further
+    instances share the same pages. Subclasses implement stream(),
+    tokenize(), detokenize() and context_length. Backends that can save
+    an evaluated context set supports_state and implement restore_prefix().
+    """
+    name = None
+    supports_state = False
+
+    def __init__(self, context_tokens=LLM_CONTEXT_TOKENS, batch_tokens=LLM_BATCH_TOKENS,
+                 threads=LLM_THREADS):
+        self.context_tokens = context_tokens
+        self.batch_tokens = batch_tokens
+        self.threads = threads
+
+    @classmethod
+    def available(cls):
+        return True
+
+    def stream(self, prompt, max_new_tokens=150):
+        """Yield the completion's text piece by piece as it is generated."""
+        raise NotImplementedError
+
+    def complete(self, prompt, max_new_tokens=150, on_text=None):
+        """
+        Run one completion; returns the stripped text.
+
+        With `on_text`, the text so far is passed to it as soon as the first
+        piece arrives, then at most every STREAM_UPDATE_INTERVAL seconds, so
+        a UI can show progress without redrawing per token.
+        """
+        text, last_update = "", 0.0
+        for piece in self.stream(prompt, max_new_tokens):
+            text += piece
+            if on_text is not None:
+                now = time.monotonic()
+                if now - last_update >= STREAM_UPDATE_INTERVAL:
+                    on_text(text.strip())
+                    last_update = now
+        return text.strip()
+
+    def restore_prefix(self, prefix):
+        """Put the context into the state right after evaluating `prefix`, if supported."""
+
+    def set_threads(self, threads):
+        """Thread count for the following calls."""
+        self.threads = threads
+
+class LlamaCppBackend(LLMBackend):
+    """
+    llama-cpp-python. It can snapshot its evaluated context, which lets
+    prompts about one transcript share a single prefill.
+    """
+    name = "llama.cpp"
+    supports_state = True
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        if not download_llama_model():
+            raise RuntimeError(f"Model file {MODEL_PATH} is not available")
+        self.model = llama_cpp.Llama(
+            model_path=MODEL_PATH,
+            n_ctx=self.context_tokens,
+            n_batch=self.batch_tokens,
+            n_threads=self.threads,
+            n_gpu_layers=0,
+            use_mmap=True,
+            use_mlock=False,
+            verbose=False
+        )
+        # Saved context of the last evaluated prefix, keyed by its digest. One
+        # entry: a 5k-token prefix is several hundred MB. Callers hold the LLM lock.
+        self._prefix_key = None
+        self._prefix_state = None
+
+    @classmethod
+    def available(cls):
+        try:
+            llama_cpp.Llama
+        except ImportError:
+            return False
+        return True
+
+    def set_threads(self, threads):
+        if threads != self.threads:
+            self.threads = threads
+            # The thread count is a context parameter; older bindings can't change it
+            with contextlib.suppress(AttributeError):
+                llama_cpp.llama_set_n_threads(self.model.ctx, threads, threads)
+
+    def stream(self, prompt, max_new_tokens=150):
+        for chunk in self.model(prompt, max_tokens=max_new_tokens, stream=True, **LLM_SAMPLING):
+            yield chunk["choices"][0]["text"]
+
+    def tokenize(self, text):
+        return self.model.tokenize(text.encode(), add_bos=False)
+
+    def detokenize(self, tokens):
+        return self.model.detokenize(tokens).decode("utf-8", errors="ignore")
+
+    @property
+    def context_length(self):
+        return self.model.n_ctx()
+
+    def restore_prefix(self, prefix):
+        """
+        Load the saved context for `prefix`, evaluating and saving it first
+        if it isn't the one kept. A following completion whose prompt starts
+        with `prefix` then only evaluates the tokens after it.
+        """
+        key = hashlib.sha256(prefix.encode()).digest()
+        if key != self._prefix_key:
+            self.model.reset()
+            self.model.eval(self.model.tokenize(prefix.encode()))
+            self._prefix_state = self.model.save_state()
+            self._prefix_key = key
+        self.model.load_state(self._prefix_state)
+
+class CTransformersBackend(LLMBackend):
+    """ctransformers, on the same model file in MODELS_DIR as llama.cpp uses."""
+    name = "ctransformers"
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        if not download_llama_model():
+            raise RuntimeError(f"Model file {MODEL_PATH} is not available")
+        self.model = ctransformers.AutoModelForCausalLM.from_pretrained(
+            MODEL_PATH,
             model_type="llama",
+            context_length=self.context_tokens,
+            batch_size=self.batch_tokens,
+            threads=self.threads,
+            mmap=True,
+            mlock=False,
             gpu_layers=0
         )
-    prompt = f"Summarize the following text concisely:\n{text}\nSummary:"
-    response = summarize_text.model(prompt, max_new_tokens=150, threads=8)
-    if isinstance(response, dict) and "choices" in response and len(response["choices"]) > 0:
-        summary = response["choices"][0]["text"].strip()
-    elif isinstance(response, str):
-        summary = response.strip()
-    else:
-        summary = "No summary generated."
-    return summary
+
+    def stream(self, prompt, max_new_tokens=150):
+        yield from self.model(prompt, max_new_tokens=max_new_tokens, threads=self.threads, stream=True,
+                              temperature=LLM_SAMPLING["temperature"], top_k=LLM_SAMPLING["top_k"],
+                              top_p=LLM_SAMPLING["top_p"],
+                              repetition_penalty=LLM_SAMPLING["repeat_penalty"])
+
+    def tokenize(self, text):
+        return self.model.tokenize(text)
+
+    def detokenize(self, tokens):
+        return self.model.detokenize(tokens)
+
+    @property
+    def context_length(self):
+        return self.model.context_length
+
+LLM_BACKENDS = {cls.name: cls for cls in (LlamaCppBackend, CTransformersBackend)}
+
+def calibrate_llm_backend(backend):
+    """Tokens per second for a short prefill plus CALIBRATION_TOKENS of generation."""
+    start = time.perf_counter()
+    generated = sum(1 for _ in backend.stream(CALIBRATION_PROMPT, CALIBRATION_TOKENS))
+    elapsed = time.perf_counter() - start
+    return (len(backend.tokenize(CALIBRATION_PROMPT)) + generated) / elapsed
+
+def _read_backend_choice():
+    try:
+        with open(LLM_BACKEND_FILE, "r") as f:
+            choice = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if not isinstance(choice, dict):
+        return None
+    # Only valid for the same model on the same machine
+    if choice.get("model") != MODEL_FILENAME or choice.get("cpu_count") != os.cpu_count():
+        return None
+    return LLM_BACKENDS.get(choice.get("backend"))
+
+def current_llm_backend():
+    """
+    Name of the backend load_llm_model() uses, without loading a model;
+    None while auto-selection hasn't calibrated yet.
+    """
+    if LLM_BACKEND != "auto":
+        return LLM_BACKEND
+    chosen = _read_backend_choice()
+    if chosen is not None:
+        return chosen.name
+    candidates = [cls for cls in LLM_BACKENDS.values() if cls.available()]
+    return candidates[0].name if len(candidates) == 1 else None
+
+def model_file_identity():
+    """Size and mtime of the model file: cheap, and changes if the file is replaced."""
+    try:
+        st = os.stat(MODEL_PATH)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+def load_llm_model():
+    """
+    Load the LLM on the configured backend. With LLM_BACKEND = "auto" and
+    more than one backend installed, each is loaded once and timed on a
+    short generation. The faster one is kept, and the choice is saved so
+    later loads skip the calibration.
+    """
+    if LLM_BACKEND != "auto":
+        return LLM_BACKENDS[LLM_BACKEND]()
+    candidates = [cls for cls in LLM_BACKENDS.values() if cls.available()]
+    chosen = _read_backend_choice()
+    if chosen in candidates:
+        return chosen()
+    if len(candidates) == 1:
+        return candidates[0]()
+
+    best, best_speed, speeds = None, 0.0, {}
+    for cls in candidates:
+        try:
+            backend = cls()
+            speeds[cls.name] = calibrate_llm_backend(backend)
+        except Exception as e:
+            print(f"LLM backend {cls.name} unavailable:", e)
+            continue
+        print(f"LLM backend {cls.name}: {speeds[cls.name]:.1f} tokens/s")
+        if speeds[cls.name] > best_speed:
+            best, best_speed = backend, speeds[cls.name]
+        del backend
+    if best is None:
+        raise RuntimeError("No LLM backend could be loaded")
+    os.makedirs(MODELS_DIR, exist_ok=True)
+    with open(LLM_BACKEND_FILE, "w") as f:
+        json.dump({"model": MODEL_FILENAME, "cpu_count": os.cpu_count(),
+                   "backend": best.name, "tokens_per_second": speeds}, f, indent=4)
+    return best
+
+def load_shared_llm():
+    """load_llm_model() for the shared instance, noting when prompts can't share a prefill."""
+    model = load_llm_model()
+    if not model.supports_state:
+        print(f"LLM backend {model.name} can't save its context, so each prompt re-evaluates "
+              "the whole transcript. Install llama-cpp-python (pip install \"openscriber[llama]\") "
+              "to evaluate it once per transcript.")
+    return model
+
+model_manager.register(LLM_MODEL, load_shared_llm)
+
+@contextlib.contextmanager
+def use_llm():
+    """
+    Hold the shared LLM, with its threads set to the LLM's current share of
+    the cores. The LLM only counts as busy once it is loaded and its lock
+    is held, so loading or waiting doesn't shrink transcription's share.
+    """
+    with model_manager.use(LLM_MODEL) as model, cpu_scheduler.running(LLM_MODEL) as threads:
+        model.set_threads(threads)
+        yield model
+
+# --- Long Transcript Map-Reduce ---
+MAP_REDUCE_MAX_NEW_TOKENS = 150
+MAP_REDUCE_PROMPT_RESERVE = 64   # Tokens for the instruction wrapped around each chunk
+MAP_REDUCE_CHUNK_OVERLAP = 200   # Tokens repeated between neighbouring chunks
+MAP_REDUCE_MAX_WORKERS = 4
+# Extra model instances share the memory-mapped weights, so each only adds
+# its KV cache (Mistral 7B: 32 layers x 8 KV heads x 128 dims, K and V, fp16)
+# and compute buffers. Keep some memory free for everything else.
+LLM_REPLICA_BYTES = LLM_CONTEXT_TOKENS * 32 * 8 * 128 * 2 * 2 + 512 * 1024 * 1024
+LLM_MEMORY_HEADROOM = 2 * 1024 * 1024 * 1024
+
+def split_tokens(n_tokens, size, overlap):
+    """(start, end) ranges of at most `size` tokens, each overlapping the previous one."""
+    step = max(size - overlap, 1)
+    ranges = []
+    for start in range(0, n_tokens, step):
+        end = min(start + size, n_tokens)
+        ranges.append((start, end))
+        if end == n_tokens:
+            break
+    return ranges
+
+def available_memory():
+    """Bytes the OS reports as available, or 0 when it can't be determined."""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+def map_workers(n_chunks, cores):
+    """
+    How many model instances to run the map step on: one per LLM_THREADS
+    of the given cores, as many extra instances as fit in free memory, at
+    most one per chunk.
+    """
+    by_cpu = cores // LLM_THREADS
+    by_memory = 1 + max(available_memory() - LLM_MEMORY_HEADROOM, 0) // LLM_REPLICA_BYTES
+    return max(1, min(MAP_REDUCE_MAX_WORKERS, n_chunks, by_cpu, by_memory))
+
+def _complete_each(texts, template, max_new_tokens=MAP_REDUCE_MAX_NEW_TOKENS):
+    """
+    Complete `template` for every text, in order.
+
+    The shared model always takes part. Each further worker loads its own
+    instance for the duration, and if that load fails, the remaining
+    workers simply take over its share.
+    """
+    prompts = [template.format(text=text) for text in texts]
+    results = [None] * len(prompts)
+    jobs = queue.Queue()
+    for i in range(len(prompts)):
+        jobs.put(i)
+
+    def _drain(model):
+        while True:
+            try:
+                i = jobs.get_nowait()
+            except queue.Empty:
+                return
+            results[i] = model.complete(prompts[i], max_new_tokens)
+
+    def _run(model):
+        # Busy only while actually completing, not while loading
+        with cpu_scheduler.running(LLM_MODEL) as cores:
+            model.set_threads(max(1, cores // workers))
+            _drain(model)
+
+    def _run_shared():
+        with model_manager.use(LLM_MODEL) as model:
+            _run(model)
+
+    def _run_replica():
+        try:
+            model = load_llm_model()
+        except Exception as e:
+            print("Extra map-reduce worker unavailable:", e)
+            return
+        _run(model)
+
+    workers = map_workers(len(prompts), cpu_scheduler.threads_for(LLM_MODEL))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_run_shared)] + [pool.submit(_run_replica) for _ in range(workers - 1)]
+        for future in futures:
+            future.result()
+    return results
+
+def chunk_budget(model, templates, max_new_tokens):
+    """Tokens of text that fit into any of `templates` alongside the answer."""
+    overhead = max(len(model.tokenize(template.format(text=""))) for template in templates)
+    return model.context_length - max_new_tokens - overhead - MAP_REDUCE_PROMPT_RESERVE
+
+def map_reduce_text(text, part_template, combine_template, max_new_tokens=MAP_REDUCE_MAX_NEW_TOKENS,
+                    on_text=None):
+    """
+    Complete `part_template` over text too long for one prompt.
+
+    The text is split into overlapping token chunks that each fit. Every
+    chunk is run through `part_template` (in parallel where memory allows),
+    then the partial answers are merged with `combine_template`, in several
+    rounds if they don't fit together. Both templates take a {text} field.
+    Cost grows linearly with length rather than breaking past the context.
+    `on_text` streams the final combine step.
+    """
+    templates = (part_template, combine_template)
+    with use_llm() as model:
+        budget = chunk_budget(model, templates, max_new_tokens)
+        tokens = model.tokenize(text)
+        # A long instruction leaves less room per chunk; keep the overlap a small part of it
+        overlap = min(MAP_REDUCE_CHUNK_OVERLAP, budget // 4)
+        chunks = [model.detokenize(tokens[start:end])
+                  for start, end in split_tokens(len(tokens), budget, overlap)]
+    partials = _complete_each(chunks, part_template, max_new_tokens)
+
+    while True:
+        with use_llm() as model:
+            joined = "\n\n".join(partials)
+            joined_tokens = model.tokenize(joined)
+            if len(partials) == 1 or len(joined_tokens) <= budget:
+                return model.complete(combine_template.format(text=joined), max_new_tokens, on_text)
+            # Too long to combine at once: group consecutive partials that fit
+            groups, group, used = [], [], 0
+            for partial in partials:
+                n = len(model.tokenize(partial)) + 2
+                if group and used + n > budget:
+                    groups.append(group)
+                    group, used = [], 0
+                group.append(partial)
+                used += n
+            groups.append(group)
+            if len(groups) == len(partials):
+                # No two partials fit together, so another round can't shrink
+                # them; combine what fits rather than looping
+                joined = model.detokenize(joined_tokens[:budget])
+                return model.complete(combine_template.format(text=joined), max_new_tokens, on_text)
+        partials = _complete_each(["\n\n".join(g) for g in groups], combine_template, max_new_tokens)
+
+# --- Transcript Prompts ---
+PROMPT_MAX_NEW_TOKENS = 150
+def transcript_prefix(transcript):
+    """Opening of every prompt about a transcript; identical for all of them."""
+    return f"Transcript:\n{transcript}\n\n"
+
+def build_prompt(transcript, instruction):
+    """
+    The transcript comes first and the instruction last, so prompts about the
+    same transcript share everything up to the instruction.
+    """
+    return transcript_prefix(transcript) + f"Based on the transcript above, {instruction}:\n"
+
+PART_PROMPT_TEMPLATE = ("Part of a longer transcript:\n{text}\n\n"
+                        "Based on this part of the transcript, {instruction}. "
+                        "If this part has nothing relevant, reply NONE:\n")
+COMBINE_PROMPT_TEMPLATE = ("The following are answers to the same request, each from a consecutive "
+                           "part of one transcript:\n{text}\n\nCombine them into one answer, "
+                           "ignoring parts that replied NONE. The request: {instruction}:\n")
+
+def prompt_fits(model, prompt, max_new_tokens):
+    """Whether `prompt` and `max_new_tokens` of answer fit in the model's context."""
+    return len(model.tokenize(prompt)) + max_new_tokens <= model.context_length
+
+def answer_prompt(transcript, instruction, max_new_tokens=PROMPT_MAX_NEW_TOKENS, on_text=None):
+    """
+    Answer one instruction about a transcript.
+
+    On a backend that can save its state, the transcript prefix is evaluated
+    once and its KV cache restored before each instruction. Completion then
+    only evaluates the instruction tokens that follow the matching prefix,
+    so N prompts cost one transcript prefill instead of N. Other backends
+    evaluate the whole prompt every time. `on_text` streams partial text
+    as in LLMBackend.complete.
+
+    A transcript too long for the context is answered chunk by chunk
+    through map_reduce_text instead of being cut off.
+    """
+    prompt = build_prompt(transcript, instruction)
+    with use_llm() as model:
+        if prompt_fits(model, prompt, max_new_tokens):
+            model.restore_prefix(transcript_prefix(transcript))
+            return model.complete(prompt, max_new_tokens, on_text)
+    # The instruction is fixed text in the templates, so protect its braces from format()
+    escaped = instruction.replace("{", "{{").replace("}", "}}")
+    return map_reduce_text(transcript, PART_PROMPT_TEMPLATE.replace("{instruction}", escaped),
+                           COMBINE_PROMPT_TEMPLATE.replace("{instruction}", escaped),
+                           max_new_tokens, on_text)
+
+def build_multi_prompt(transcript, prompts):
+    """One prompt asking for a JSON object answering every (name, instruction)."""
+    fields = "\n".join(f"- {json.dumps(name)}: {instruction}" for name, instruction in prompts)
+    return transcript_prefix(transcript) + (
+        "Answer each of the following about the transcript above. Reply with only a "
+        "JSON object whose keys are exactly these names and whose values are the "
+        f"answers as strings:\n{fields}\nJSON:\n"
+    )
+
+def parse_multi_answer(text, names):
+    """
+    Pull {name: answer} out of a single-pass reply.
+
+    The reply is parsed as a JSON object first. If that fails, for example
+    because generation stopped mid-object, each complete "name": "value"
+    pair is recovered on its own. Names with no usable answer are left out
+    so the caller can ask for them separately.
+    """
+    start, end = text.find("{"), text.rfind("}")
+    try:
+        parsed = json.loads(text[start:end + 1]) if start != -1 and end > start else None
+    except json.JSONDecodeError:
+        parsed = None
+    if not isinstance(parsed, dict):
+        parsed = {}
+        for name in names:
+            match = re.search(re.escape(json.dumps(name)) + r'\s*:\s*("(?:[^"\\]|\\.)*")', text)
+            if match:
+                try:
+                    parsed[name] = json.loads(match.group(1))
+                except json.JSONDecodeError:
+                    pass
+    answers = {}
+    for name in names:
+        value = parsed.get(name)
+        if isinstance(value, list):
+            value = "\n".join(str(item) for item in value)
+        elif value is not None and not isinstance(value, str):
+            value = json.dumps(value)
+        if isinstance(value, str) and value.strip():
+            answers[name] = value.strip()
+    return answers
+
+MULTI_PROMPT_TOKENS_PER_FIELD = PROMPT_MAX_NEW_TOKENS  # Same budget each prompt gets on its own
+
+def answer_prompts_together(transcript, prompts, on_text=None):
+    """
+    Answer several (name, instruction) pairs with a single completion.
+
+    Returns {name: answer} for the fields that came back intact; missing
+    names should fall back to answer_prompt. The prompt shares the
+    transcript prefix, so a saved prefix state is reused here as well.
+    When the transcript and every answer don't fit in the context, nothing
+    is returned and each prompt falls back to answer_prompt's map-reduce.
+    """
+    max_new_tokens = MULTI_PROMPT_TOKENS_PER_FIELD * len(prompts) + 20
+    prompt = build_multi_prompt(transcript, prompts)
+    with use_llm() as model:
+        if not prompt_fits(model, prompt, max_new_tokens):
+            return {}
+        model.restore_prefix(transcript_prefix(transcript))
+        reply = model.complete(prompt, max_new_tokens, on_text)
+    return parse_multi_answer(reply, [name for name, _ in prompts])
+
+# --- Prompt Result Cache ---
+PROMPT_CACHE_MAX_BYTES = 32 * 1024 * 1024
+PROMPT_CACHE_MAX_ENTRIES = 4096
+PROMPT_CACHE_LOW_WATER = 0.9  # Eviction trims to this fraction of the limits, so it runs in batches
+
+class PromptResultCache:
+    """
+    Encrypted on-disk cache of prompt answers, so reopening a transcript
+    shows its results without running the LLM again.
+
+    Entries are content-addressed: the file name is a SHA-256 over hashes
+    of the transcript, the instruction, the model file (name, size and
+    mtime), the backend and the generation settings, so changing any of
+    them simply misses. Each file holds the Fernet-encrypted answer.
+
+    The directory is scanned once, into an in-memory index of entries in
+    least-recently-used order with their sizes, so a put or a hit costs the
+    same however many entries there are. A hit also refreshes the file's
+    mtime, which orders the index on the next start. When the directory
+    grows past `max_bytes` or `max_entries`, the least recently used
+    entries are deleted until it is back under PROMPT_CACHE_LOW_WATER of
+    both limits.
+    """
+    def __init__(self, cache_dir, max_bytes=PROMPT_CACHE_MAX_BYTES, max_entries=PROMPT_CACHE_MAX_ENTRIES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        entries = []
+        for fname in os.listdir(cache_dir):
+            if fname.endswith(".bin"):
+                with contextlib.suppress(FileNotFoundError):
+                    st = os.stat(os.path.join(cache_dir, fname))
+                    entries.append((st.st_mtime, fname, st.st_size))
+        self._index = collections.OrderedDict((fname, size) for _, fname, size in sorted(entries))
+        self._total = sum(self._index.values())
+
+    def key(self, transcript, instruction):
+        digest = lambda text: hashlib.sha256(text.encode()).hexdigest()
+        parts = {
+            "transcript": digest(transcript),
+            "prompt": digest(instruction),
+            "model": f"{MODEL_REPO}/{MODEL_FILENAME}",
+            "model_file": model_file_identity(),
+            "backend": current_llm_backend(),
+            "params": {
+                "max_new_tokens": PROMPT_MAX_NEW_TOKENS,
+                "sampling": LLM_SAMPLING,
+                # Changes whenever the prompt wording around the two does
+                "format": digest(build_prompt("{transcript}", "{instruction}")),
+            },
+        }
+        return digest(json.dumps(parts, sort_keys=True))
+
+    def get(self, transcript, instruction):
+        """Cached answer for this transcript and instruction, or None."""
+        fname = self.key(transcript, instruction) + ".bin"
+        path = os.path.join(self.cache_dir, fname)
+        try:
+            with open(path, "rb") as f:
+                result = fernet.decrypt(f.read()).decode()
+            os.utime(path)
+        except Exception:
+            return None
+        with self._lock:
+            if fname in self._index:
+                self._index.move_to_end(fname)
+        return result
+
+    def put(self, transcript, instruction, result):
+        fname = self.key(transcript, instruction) + ".bin"
+        path = os.path.join(self.cache_dir, fname)
+        data = fernet.encrypt(result.encode())
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self._lock:
+            self._total += len(data) - self._index.pop(fname, 0)
+            self._index[fname] = len(data)
+            if self._total > self.max_bytes or len(self._index) > self.max_entries:
+                self._evict()
+
+    def _evict(self):
+        # Caller holds the lock
+        max_bytes = self.max_bytes * PROMPT_CACHE_LOW_WATER
+        max_entries = int(self.max_entries * PROMPT_CACHE_LOW_WATER)
+        while self._index and (self._total > max_bytes or len(self._index) > max_entries):
+            fname, size = self._index.popitem(last=False)
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(os.path.join(self.cache_dir, fname))
+            self._total -= size
+
+# --- Prompt Jobs ---
+PROMPT_JOB_WORKERS = 1     # The LLM runs one inference at a time; more would only wait on its lock
+PRIORITY_INTERACTIVE = 0   # Lower runs first
+PRIORITY_BATCH = 10
+
+def transcript_key(transcript):
+    return hashlib.sha256(transcript.encode()).hexdigest()
+
+class JobCancelled(Exception):
+    """Raised inside a running job once it has been cancelled."""
+
+class PromptJob:
+    def __init__(self, key, group, fn, priority, cancellable=True):
+        self.key = key
+        self.group = group
+        self.fn = fn
+        self.priority = priority
+        self.cancellable = cancellable
+        self.started = False
+        self.cancelled = False
+        self.callbacks = []  # (on_text, on_done) per submitter
+
+    def report_text(self, text):
+        """Streaming callback handed to the job; also where a cancelled job stops."""
+        if self.cancelled:
+            raise JobCancelled()
+        for on_text, _ in list(self.callbacks):
+            if on_text is not None:
+                on_text(text)
+
+class PromptJobScheduler:
+    """
+    Run LLM jobs on a bounded pool of worker threads, most urgent first.
+
+    Every job has a key naming its work and a group, the transcript it
+    belongs to. Submitting a key that is already queued or running adds
+    the new callbacks to that job instead of doing the work twice, and a
+    more urgent submission moves a queued job forward. cancel_other_groups()
+    drops queued jobs for other transcripts. It also flags running ones,
+    which stop at their next streamed update. Cancelled jobs never call
+    back. Jobs submitted with cancellable=False, such as prompts for a
+    session finished in the background, are left running. Workers are
+    daemon threads started on the first submission.
+    """
+    def __init__(self, workers=PROMPT_JOB_WORKERS):
+        self.workers = workers
+        self._threads = []
+        self._heap = []
+        self._jobs = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def submit(self, key, group, fn, priority=PRIORITY_BATCH, on_text=None, on_done=None, cancellable=True):
+        """
+        Queue fn(on_text) -> result. on_text(text) receives streamed partial
+        text and on_done(result, error) the outcome, both on a worker thread.
+        """
+        with self._cond:
+            job = self._jobs.get(key)
+            if job is None:
+                job = PromptJob(key, group, fn, priority, cancellable)
+                self._jobs[key] = job
+                heapq.heappush(self._heap, (priority, next(self._seq), job))
+            elif priority < job.priority and not job.started:
+                # The earlier heap entry becomes stale and is skipped when popped
+                job.priority = priority
+                heapq.heappush(self._heap, (priority, next(self._seq), job))
+            job.cancellable = job.cancellable and cancellable
+            job.callbacks.append((on_text, on_done))
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, daemon=True)
+                self._threads.append(thread)
+                thread.start()
+            self._cond.notify()
+            return job
+
+    def cancel_other_groups(self, group):
+        """Cancel every queued or running job that doesn't belong to `group`."""
+        with self._cond:
+            for key, job in list(self._jobs.items()):
+                if job.group != group and job.cancellable:
+                    job.cancelled = True
+                    del self._jobs[key]
+
+    def _next_job(self):
+        with self._cond:
+            while True:
+                while not self._heap:
+                    self._cond.wait()
+                _, _, job = heapq.heappop(self._heap)
+                if not job.started and not job.cancelled:
+                    job.started = True
+                    return job
+
+    def _work(self):
+        while True:
+            job = self._next_job()
+            result, error = None, None
+            try:
+                result = job.fn(job.report_text)
+            except JobCancelled:
+                pass
+            except Exception as e:
+                error = e
+            with self._cond:
+                if self._jobs.get(job.key) is job:
+                    del self._jobs[job.key]
+                if job.cancelled:
+                    continue
+                callbacks = list(job.callbacks)
+            for _, on_done in callbacks:
+                if on_done is not None:
+                    on_done(result, error)
+
+# --- Model Warm-up ---
+def warm_up_models(report_status=print):
+    """
+    Load Whisper and the LLM on a background thread and prime each with a
+    tiny inference, so the first transcript and prompt skip the cold load.
+
+    Progress is passed to report_status as short status-line messages.
+    """
+    def _warm_up():
+        try:
+            report_status("Loading transcription model...")
+            # One second of silence runs the encoder and a short decode
+            decode_audio_window(np.zeros(WHISPER_SAMPLE_RATE, dtype=np.float32))
+            report_status("Loading language model...")
+            with use_llm() as model:
+                model.complete("Hello", max_new_tokens=1)
+            report_status("Models ready.")
+        except Exception as e:
+            print("Model warm-up failed:", e)
+            report_status("Model warm-up failed; models will load on first use.")
+    thread = threading.Thread(target=_warm_up, daemon=True)
+    thread.start()
+    return thread
 
 # --- Login Dialog ---
 class PromptDialog(QDialog):
@@ -337,39 +2590,85 @@ class LoginDialog(QDialog):
 # --- Main Application Window ---
 class MainWindow(QMainWindow):
     # Signals to safely update the UI from worker threads.
-    transcription_done = pyqtSignal(str, str)
+    transcription_done = pyqtSignal(str, str, int)  # audio file, transcript, transcript id
+    transcript_loaded = pyqtSignal(int, str)  # transcript id, text
+    transcription_partial = pyqtSignal(str, str)  # audio file, text
+    transcription_failed = pyqtSignal(str, str)  # audio file, error
+    import_failed = pyqtSignal(str, str)  # source file, error
+    status_message = pyqtSignal(str)
+    model_status_changed = pyqtSignal(str)
     transcription_progress_update = pyqtSignal(int)
-    summary_done = pyqtSignal(str)
-    prompt_result_ready = pyqtSignal(str, str)  # prompt_name, result
+    queue_status_changed = pyqtSignal(str)
+    prompt_result_ready = pyqtSignal(str, str, str)  # transcript key, prompt_name, result
+    prompt_result_partial = pyqtSignal(str, str, str)  # transcript key, prompt_name, text so far
 
     def __init__(self):
         super(MainWindow, self).__init__()
         self.setWindowTitle("OpenChart - Telemedicine Transcriber")
         self.resize(900, 600)
         
+        # Transcripts live in an indexed, encrypted store; import any older files once
+        self.transcript_store = TranscriptStore(os.path.join(TRANSCRIPTS_DIR, TRANSCRIPT_DB_NAME))
+        self.transcript_store.migrate_legacy_files(TRANSCRIPTS_DIR)
+        self.current_transcript_id = None
+        self.transcripts_listed = 0  # Rows of the store shown in the list so far
+        self.search_query = ""
+        
         # Initialize prompt configuration
         self.prompt_config = PromptConfig()
+        self.prompt_cache = PromptResultCache(PROMPT_CACHE_DIR)
+        self.prompt_jobs = PromptJobScheduler()
+        self.active_transcript_key = None  # Results for other transcripts are ignored
         self.prompt_results = {}  # Store results for each prompt
         self.prompt_edits = {}    # Store editable QLineEdit for prompt instructions
+        self.prompt_result_boxes = {}  # Result QTextEdit for each shown prompt
         
         # Audio recording parameters (PyAudio)
         self.audio = pyaudio.PyAudio()
         self.CHUNK = 1024
         self.FORMAT = pyaudio.paInt16
         self.CHANNELS = 1
-        self.RATE = 44100
+        self.RATE = WHISPER_SAMPLE_RATE     # Session files are stored at Whisper's rate
+        self.FALLBACK_CAPTURE_RATE = 44100  # Used when the device can't report its rate
+        self.capture_rate = self.RATE
+        self.resampler = None
         self.is_recording = False
-        self.frames = []
+        self.spool = None
+        self.session_audio = None
+        self.live_thread = None
+        self.live_stop = None  # Set at Stop; each session's live thread gets its own
+        self.live_view_file = None  # Session whose live text the transcript view shows
+        self.capture = None
         self.stream = None
+        # Recordings are transcribed one at a time, in order, and survive restarts
+        self.transcription_queue = TranscriptionQueue(
+            AUDIO_DIR, self.run_transcription_job, on_change=self.report_queue_status,
+            on_error=lambda audio_file, e: self.transcription_failed.emit(audio_file, str(e))
+        )
+        
+        # Surface capture overruns while recording
+        self.capture_status_timer = QTimer(self)
+        self.capture_status_timer.setInterval(1000)
+        self.capture_status_timer.timeout.connect(self.update_capture_status)
         
         # Set up UI components
         self.setup_ui()
         
         # Connect signals
         self.transcription_done.connect(self.on_transcription_done)
+        self.transcript_loaded.connect(self.on_transcript_loaded)
+        self.transcription_partial.connect(self.on_transcription_partial)
+        self.transcription_failed.connect(self.on_transcription_failed)
+        self.import_failed.connect(self.on_import_failed)
         self.transcription_progress_update.connect(self.update_transcription_progress)
-        self.summary_done.connect(self.on_summary_done)
+        self.queue_status_changed.connect(self.on_queue_status_changed)
+        self.status_message.connect(self.status_label.setText)
+        self.model_status_changed.connect(self.on_model_status_changed)
         self.prompt_result_ready.connect(self.on_prompt_result_ready)
+        self.prompt_result_partial.connect(self.on_prompt_result_partial)
+        
+        # Pick up sessions that were still recording or queued when the app last exited
+        self.resume_interrupted_recordings()
         
         # For auto logout a QTimer could be added here to track inactivity.
         # self.logout_timer = QTimer(self)
@@ -383,11 +2682,21 @@ class MainWindow(QMainWindow):
         central_widget.setLayout(main_layout)
         self.setCentralWidget(central_widget)
         
-        # Left: Transcript List
+        # Left: Search box and Transcript List
+        left_panel = QVBoxLayout()
+        self.search_input = QLineEdit()
+        self.search_input.setFixedWidth(250)
+        self.search_input.setPlaceholderText("Search transcripts (whole words)")
+        self.search_input.setClearButtonEnabled(True)
+        self.search_input.textChanged.connect(self.search_transcripts)
+        left_panel.addWidget(self.search_input)
         self.transcript_list = QListWidget()
         self.transcript_list.setFixedWidth(250)
         self.transcript_list.itemClicked.connect(self.load_transcript)
-        main_layout.addWidget(self.transcript_list)
+        # Further pages are fetched as the list is scrolled to its end
+        self.transcript_list.verticalScrollBar().valueChanged.connect(self.on_transcript_list_scrolled)
+        left_panel.addWidget(self.transcript_list)
+        main_layout.addLayout(left_panel)
         self.refresh_transcript_list()
         
         # Right: Main panel with controls and transcript view
@@ -397,11 +2706,21 @@ class MainWindow(QMainWindow):
         self.status_label = QLabel("Idle")
         right_panel.addWidget(self.status_label)
         
+        # Transcription queue depth and ETA (hidden while the queue is empty)
+        self.queue_label = QLabel()
+        self.queue_label.setVisible(False)
+        right_panel.addWidget(self.queue_label)
+        
         # Record button
         self.record_button = QPushButton("Record")
         self.record_button.clicked.connect(self.toggle_recording)
         right_panel.addWidget(self.record_button)
         
+        # Live mode transcribes each completed window while still recording
+        self.live_checkbox = QCheckBox("Live transcription")
+        self.live_checkbox.setChecked(True)
+        right_panel.addWidget(self.live_checkbox)
+        
         # Transcription progress indicator (hidden by default)
         self.transcription_progress = QProgressBar()
         self.transcription_progress.setVisible(False)
@@ -413,11 +2732,20 @@ class MainWindow(QMainWindow):
         self.transcript_text.setPlaceholderText("Transcript appears here after recording...")
         right_panel.addWidget(self.transcript_text)
         
+        # Import an existing recording for transcription
+        import_button = QPushButton("Import Recording")
+        import_button.clicked.connect(self.import_recording)
+        right_panel.addWidget(import_button)
+        
         # Manage Prompts button
         manage_prompts_button = QPushButton("Manage Prompts")
         manage_prompts_button.clicked.connect(self.show_prompt_dialog)
         right_panel.addWidget(manage_prompts_button)
         
+        # Single-pass mode asks for every enabled prompt in one LLM call
+        self.single_pass_checkbox = QCheckBox("Answer all prompts in one pass")
+        right_panel.addWidget(self.single_pass_checkbox)
+        
         # Prompts Results Area
         prompts_group = QWidget()
         self.prompts_layout = QVBoxLayout(prompts_group)
@@ -436,164 +2764,473 @@ class MainWindow(QMainWindow):
     def start_recording(self):
         self.status_label.setText("Recording...")
         self.record_button.setText("Stop")
+        # Encrypt audio straight into the session file as it is captured
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        audio_filename = os.path.join(AUDIO_DIR, f"session_{timestamp}{ENCRYPTED_AUDIO_EXT}")
+        self.spool = EncryptedAudioWriter(audio_filename + PARTIAL_SUFFIX,
+                                          self.CHANNELS,
+                                          self.audio.get_sample_size(self.FORMAT),
+                                          self.RATE)
+        # Capture at 16 kHz when the device allows it, else resample in process
+        self.capture_rate = negotiate_capture_rate(self.audio, self.CHANNELS, self.FORMAT,
+                                                   self.FALLBACK_CAPTURE_RATE)
+        self.resampler = None
+        if self.capture_rate != self.RATE:
+            self.resampler = PolyphaseResampler(self.capture_rate, self.RATE)
+        self.capture = RingBufferCapture(self.capture_rate, self.CHANNELS)
+        self.session_audio = SessionAudioBuffer()
         self.is_recording = True
-        self.frames = []
-        # Open stream for recording
+        # Open stream in callback mode; PortAudio fills the ring buffer
         self.stream = self.audio.open(format=self.FORMAT,
                                       channels=self.CHANNELS,
-                                      rate=self.RATE,
+                                      rate=self.capture_rate,
                                       input=True,
-                                      frames_per_buffer=self.CHUNK)
-        # Start recording in a separate thread
+                                      frames_per_buffer=self.CHUNK,
+                                      stream_callback=self.capture.callback)
+        # Drain the ring buffer into the session file in a separate thread
         self.recording_thread = threading.Thread(target=self.record)
         self.recording_thread.start()
+        self.capture_status_timer.start()
+        self.live_thread = None
+        self.live_stop = threading.Event()
+        if self.live_checkbox.isChecked():
+            self.transcript_text.clear()
+            self.current_transcript_id = None
+            self.live_view_file = audio_filename
+            self.live_thread = threading.Thread(
+                target=self.live_transcribe,
+                args=(self.session_audio, self.spool, audio_filename, self.live_stop)
+            )
+            self.live_thread.start()
+    
+    def update_capture_status(self):
+        if self.is_recording and self.capture.overruns:
+            self.status_label.setText(f"Recording... ({self.capture.overruns} capture overrun(s))")
     
     def record(self):
-        while self.is_recording:
-            try:
-                data = self.stream.read(self.CHUNK, exception_on_overflow=False)
-                self.frames.append(data)
-            except Exception as e:
-                print("Recording error:", e)
-                self.is_recording = False
+        """Drain captured samples into the session file until recording stops."""
+        block = np.empty(self.capture_rate * self.CHANNELS, dtype=np.int16)
+        while True:
+            recording = self.is_recording
+            self.capture.wait(timeout=0.25)
+            n = self.capture.read_into(block)
+            if n:
+                try:
+                    samples = block[:n]
+                    audio = pcm16_to_float32(samples)
+                    if self.resampler is not None:
+                        audio = self.resampler.process(audio)
+                        samples = float32_to_pcm16(audio)
+                    self.session_audio.append(audio)
+                    self.spool.write(samples)
+                except Exception as e:
+                    print("Recording error:", e)
+                    self.is_recording = False
+                    self.live_stop.set()
+                    break
+            elif not recording:
                 break
     
     def stop_recording(self):
         if self.is_recording:
-            self.is_recording = False
-            if self.recording_thread.is_alive():
-                self.recording_thread.join()
+            self.capture_status_timer.stop()
+            # Stop the callback first so everything captured is in the ring
             if self.stream and self.stream.is_active():
                 try:
                     self.stream.stop_stream()
                     self.stream.close()
                 except Exception as e:
                     print("Error stopping stream:", e)
+            self.is_recording = False
+            self.live_stop.set()
+            self.capture.wake()
+            if self.recording_thread.is_alive():
+                self.recording_thread.join()
             self.record_button.setText("Record")
-            self.status_label.setText("Processing audio...")
+            if self.capture.overruns:
+                print(f"Capture overruns: {self.capture.input_overflows} input overflow(s), "
+                      f"{self.capture.dropped_samples} sample(s) dropped")
+                self.status_label.setText(f"Processing audio... ({self.capture.overruns} capture overrun(s))")
+            else:
+                self.status_label.setText("Processing audio...")
             # Show the transcription progress indicator as busy
             self.transcription_progress.setVisible(True)
             self.transcription_progress.setRange(0, 0)
             
-            # Save audio to file with a timestamp-based name
-            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            audio_filename = os.path.join(AUDIO_DIR, f"session_{timestamp}.wav")
+            # Save the session file now; only its transcription waits in the queue
+            spool, session_audio, live_thread = self.spool, self.session_audio, self.live_thread
+            self.spool = None
+            self.session_audio = None
+            self.live_thread = None
+            audio_filename = spool.filename[:-len(PARTIAL_SUFFIX)]
+            archived = Future()
+            threading.Thread(target=self.archive_session,
+                             args=(spool, audio_filename, archived,
+                                   live_thread if session_audio.overflowed else None)).start()
+            # The file is still being archived under its .part name, so give the length for the ETA
+            self.transcription_queue.submit(audio_filename, duration=spool.frames_written / WHISPER_SAMPLE_RATE,
+                                            archived=archived, session_audio=session_audio,
+                                            live_thread=live_thread)
+    
+    def live_transcribe(self, session_audio, spool, audio_file, stop):
+        """
+        Decode each completed window while the session is still recording.
+
+        Progress goes to the same journal process_transcription resumes
+        from, so at Stop only the last partial window is left to decode.
+        The thread ends once `stop`, this session's own Event, is set, even
+        if a new recording has started by then.
+        """
+        journal = TranscriptionJournal(audio_file)
+        i = 0
+        while True:
+            recording = not stop.is_set()
+            # Past the in-memory cap windows are read back from the spool file
+            available = spool.frames_written if session_audio.overflowed else session_audio.length
+            # If decoding fell behind, catch up with a batch of ready windows
+            ready = min(available // WINDOW_SAMPLES - i, TRANSCRIBE_BATCH_SIZE)
+            if ready <= 0:
+                if not recording:
+                    break
+                stop.wait(0.5)
+                continue
+            audio_chunks = []
+            for j in range(i, i + ready):
+                if session_audio.overflowed:
+                    audio_chunks.append(spool.read_window(j * WINDOW_SAMPLES, WINDOW_SAMPLES))
+                else:
+                    audio_chunks.append(session_audio.view(j * WINDOW_SAMPLES, (j + 1) * WINDOW_SAMPLES))
+            # Windows without speech are skipped rather than decoded
+            speech = [bool(plan_windows(c, 0)) for c in audio_chunks]
             try:
-                wf = wave.open(audio_filename, "wb")
-                wf.setnchannels(self.CHANNELS)
-                wf.setsampwidth(self.audio.get_sample_size(self.FORMAT))
-                wf.setframerate(self.RATE)
-                wf.writeframes(b"".join(self.frames))
-                wf.close()
-                # Start transcription in a background thread
-                t = threading.Thread(target=self.process_transcription, args=(audio_filename,))
-                t.start()
+                texts = iter(decode_audio_windows([c for c, has_speech in zip(audio_chunks, speech) if has_speech])
+                             if any(speech) else [])
             except Exception as e:
-                print("Error saving audio file:", e)
-                self.status_label.setText("Error saving audio file")
-    
-    def process_transcription(self, audio_file):
-        # Load full audio using Whisper's utility
-        audio = whisper.load_audio(audio_file)
-        sr = 16000  # Whisper's expected sample rate
-        chunk_duration = 30  # Process audio in 30-second chunks
-        chunk_length = chunk_duration * sr
-        total_length = audio.shape[0]
-        total_chunks = int(np.ceil(total_length / chunk_length))
-        
-        # Determine state file to persist progress
-        state_file = audio_file + '.state'
-        start_chunk = 0
-        transcript = ""
-        if os.path.exists(state_file):
-            with open(state_file, 'r') as f:
-                state = json.load(f)
-                start_chunk = state.get("last_processed_chunk", 0) + 1
-                transcript = state.get("transcript", "")
-        
-        # Load Whisper model (reuse if already loaded)
-        if not hasattr(transcribe_audio, "model"):
-            transcribe_audio.model = whisper.load_model("base")
-        model = transcribe_audio.model
-        
-        # Process audio in chunks
-        for i in range(start_chunk, total_chunks):
-            start_sample = i * chunk_length
-            end_sample = min((i + 1) * chunk_length, total_length)
-            audio_chunk = audio[start_sample:end_sample]
-            # Pad last chunk with zeros if needed
-            if audio_chunk.shape[0] < chunk_length:
-                pad_width = chunk_length - audio_chunk.shape[0]
-                audio_chunk = np.pad(audio_chunk, (0, pad_width), mode='constant')
-            
-            # Compute mel spectrogram and decode transcript for this chunk
-            mel = whisper.log_mel_spectrogram(audio_chunk)
-            options = whisper.DecodingOptions()
-            result = whisper.decode(model, mel, options)
-            chunk_transcript = result.text
-            transcript += chunk_transcript + " "
+                print("Live transcription error:", e)
+                break
+            for has_speech in speech:
+                i += 1
+                if has_speech:
+                    chunk_transcript = next(texts)
+                    journal.append(i * WINDOW_SAMPLES, chunk_transcript)
+                    self.transcription_partial.emit(audio_file, chunk_transcript + " ")
+                else:
+                    journal.append(i * WINDOW_SAMPLES)
+        journal.close()
+    
+    def on_model_status_changed(self, text):
+        # Don't hide recording or transcription status behind warm-up messages
+        if not self.is_recording and not self.transcription_progress.isVisible():
+            self.status_label.setText(text)
+    
+    def on_transcription_partial(self, audio_file, text):
+        if audio_file != self.live_view_file:
+            return  # Another transcript was opened, or this session's view was replaced
+        cursor = self.transcript_text.textCursor()
+        cursor.movePosition(cursor.End)
+        cursor.insertText(text)
+    
+    def archive_session(self, spool, audio_filename, archived, live_thread=None):
+        """
+        Flush the last block and give the session file its final name,
+        setting `archived` when done. Runs at Stop rather than when the
+        session's turn in the queue comes, so quitting with sessions still
+        queued loses nothing. A live thread still reading windows back from
+        the spool is waited for first.
+        """
+        if live_thread is not None:
+            live_thread.join()
+        try:
+            spool.close()
+            os.replace(spool.filename, audio_filename)
+        except Exception as e:
+            print("Error saving audio file:", e)
+            self.status_message.emit("Error saving audio file")
+            archived.set_exception(e)
+        else:
+            archived.set_result(audio_filename)
+    
+    def finish_session(self, archived, session_audio, audio_filename, live_thread=None, on_progress=None):
+        """Transcribe a just-recorded session from memory; `archived` is its archive_session Future."""
+        try:
+            if live_thread is not None:
+                # Let live mode finish its current window; the final pass resumes after it
+                live_thread.join()
+            if session_audio.overflowed:
+                # Too long to keep in memory; transcribe from the archived file
+                archived.result()
+                audio = None
+            else:
+                audio = session_audio.view()
+            # The pool is for imported and archived recordings; a fresh
+            # session is mostly transcribed already or short enough not to need it
+            self.process_transcription(audio_filename, audio=audio, parallel=False,
+                                       on_progress=on_progress)
+        finally:
+            audio = None
+            session_audio.close()
+    
+    def resume_interrupted_recordings(self):
+        """Queue crashed sessions and unfinished transcriptions from the last run."""
+        resumed = self.transcription_queue.resume()
+        if resumed:
+            self.status_label.setText(f"Resuming {len(resumed)} unfinished recording(s).")
+    
+    def run_transcription_job(self, job, report_progress):
+        """Queue worker: transcribe one recording, from memory when it was just recorded."""
+        if "session_audio" in job.options:
+            self.finish_session(job.options["archived"], job.options["session_audio"], job.audio_file,
+                                job.options["live_thread"], on_progress=report_progress)
+        else:
+            def _set_duration(seconds):
+                job.duration = seconds
+            self.process_transcription(job.audio_file, on_progress=report_progress, on_duration=_set_duration)
+    
+    def report_queue_status(self):
+        """Called from any thread when the queue changes; formats depth and ETA for the UI."""
+        depth, eta = self.transcription_queue.status()
+        if depth == 0:
+            text = ""
+        elif eta is None:
+            text = f"Transcription queue: {depth} recording(s)"
+        else:
+            text = f"Transcription queue: {depth} recording(s), about {max(1, math.ceil(eta / 60))} min left"
+        self.queue_status_changed.emit(text)
+    
+    def on_queue_status_changed(self, text):
+        self.queue_label.setText(text)
+        self.queue_label.setVisible(bool(text))
+    
+    def import_recording(self):
+        """Encrypt an existing recording into the audio folder and transcribe it."""
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Import Recording", "", "Audio Files (*.wav *.mp3 *.m4a *.flac *.ogg);;All Files (*)"
+        )
+        if not path:
+            return
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        name = os.path.splitext(os.path.basename(path))[0]
+        audio_filename = os.path.join(AUDIO_DIR, f"import_{timestamp}_{name}{ENCRYPTED_AUDIO_EXT}")
+        self.status_label.setText(f"Importing {os.path.basename(path)}...")
+        self.transcription_progress.setVisible(True)
+        self.transcription_progress.setRange(0, 0)
+        # Decoding a long recording takes a while; keep it off the UI thread
+        threading.Thread(target=self.import_in_background, args=(path, audio_filename), daemon=True).start()
+    
+    def import_in_background(self, path, audio_filename):
+        try:
+            duration = encrypt_audio_file(path, audio_filename)
+        except Exception as e:
+            print("Error importing recording:", e)
+            self.import_failed.emit(path, str(e))
+            return
+        self.status_message.emit(f"Transcribing {os.path.basename(path)}...")
+        self.transcription_queue.submit(audio_filename, duration=duration)
+    
+    def on_import_failed(self, path, error):
+        if self.transcription_queue.status()[0] == 0:
+            self.transcription_progress.setVisible(False)
+        self.status_label.setText("")
+        QMessageBox.warning(self, "Import Failed", f"Could not import {os.path.basename(path)}: {error}")
+    
+    def process_transcription(self, audio_file, audio=None, batch_size=TRANSCRIBE_BATCH_SIZE,
+                              parallel=None, vad=VAD_ENABLED, on_progress=None, on_duration=None):
+        """
+        Transcribe a recording window by window, resuming from its journal.
+
+        With `vad`, silent stretches are skipped and speech is packed into
+        windows. Long recordings are spread over a process pool unless
+        `parallel` is False; by default the pool is used once
+        PARALLEL_MIN_CHUNKS windows remain. Sessions just recorded pass
+        False, so only imports and resumed recordings use it. `on_progress`
+        receives the fraction of the recording done and `on_duration` its
+        length in seconds, once known. The transcript is saved before the
+        journal is removed, so a crash in between loses nothing.
+        
+        Encrypted session files are read back TRANSCRIBE_SPAN_SAMPLES at a
+        time, so memory stays bounded however long the session was and only
+        the audio still to be transcribed is decrypted.
+        """
+        # Replay the journal of windows already transcribed, if any
+        journal = TranscriptionJournal(audio_file)
+        offset, transcript = journal.replay()
+        
+        # Load 16 kHz float32 audio in process unless the caller already has it,
+        # skipping audio that was already transcribed
+        if audio is not None:
+            total_length = audio.shape[0]
+            spans = [(offset, audio[offset:])]
+        elif is_encrypted_audio(audio_file):
+            with EncryptedAudioReader(audio_file) as reader:
+                total_length = reader.frames
+            spans = ((start, read_audio_window(audio_file, start, TRANSCRIBE_SPAN_SAMPLES))
+                     for start in range(offset, total_length, TRANSCRIBE_SPAN_SAMPLES))
+        else:
+            audio = load_audio_16k(audio_file, start=offset)
+            total_length = offset + audio.shape[0]
+            spans = [(offset, audio)]
+        if on_duration is not None:
+            on_duration(total_length / WHISPER_SAMPLE_RATE)
+        if on_progress is not None:
+            on_progress(offset / max(total_length, 1))
+        
+        for span_start, audio in spans:
+            span_end = span_start + audio.shape[0]
+            windows = plan_windows(audio, span_start, vad=vad)
             
-            # Persist state after processing this chunk
-            with open(state_file, 'w') as f:
-                json.dump({"last_processed_chunk": i, "transcript": transcript}, f)
+            use_pool = parallel
+            if use_pool is None:
+                use_pool = len(windows) >= PARALLEL_MIN_CHUNKS and parallel_worker_count() > 1
+            if use_pool:
+                results = iter_transcribe_chunks_parallel(audio, span_start, windows, batch_size)
+            else:
+                results = iter_transcribe_chunks(audio, span_start, windows, batch_size)
             
-            # Update progress on UI using signal
-            progress_percent = int(((i + 1) / total_chunks) * 100)
-            self.transcription_progress_update.emit(progress_percent)
+            # Reassemble windows in order; results may arrive out of order from the pool
+            finished = {}
+            next_window = 0
+            for completed, (j, chunk_transcript) in enumerate(results, start=1):
+                finished[j] = chunk_transcript
+                while next_window in finished:
+                    chunk_transcript = finished.pop(next_window)
+                    transcript += chunk_transcript + " "
+                    
+                    # Journal each window of the contiguous prefix
+                    journal.append(windows[next_window][1], chunk_transcript)
+                    next_window += 1
+                
+                # Update progress on UI using signal
+                done_samples = span_start + (span_end - span_start) * completed / len(windows)
+                progress_percent = int((done_samples / max(total_length, 1)) * 100)
+                self.transcription_progress_update.emit(progress_percent)
+                if on_progress is not None:
+                    on_progress(done_samples / max(total_length, 1))
+            if span_end < total_length:
+                # Resume after this span even if its tail was silent
+                journal.append(span_end)
+            audio = None
+        self.transcription_progress_update.emit(100)
         
-        # Remove state file after completion
-        if os.path.exists(state_file):
-            os.remove(state_file)
+        # Save the transcript, then remove the journal after completion
+        transcript_id = self.transcript_store.add(transcript, duration=total_length / WHISPER_SAMPLE_RATE,
+                                                  audio_file=audio_file)
+        journal.remove()
         
-        self.transcription_done.emit(audio_file, transcript)
+        self.transcription_done.emit(audio_file, transcript, transcript_id)
     
-    def on_transcription_done(self, audio_file, transcript):
+    def on_transcription_done(self, audio_file, transcript, transcript_id):
+        if self.is_recording and self.live_thread is not None:
+            # The view holds live text for the recording in progress, or a
+            # transcript opened meanwhile; leave it. The finished transcript's
+            # prompts run in the background, so its results are cached by the
+            # time it is opened from the list.
+            self.status_label.setText(f"Recording... ({os.path.basename(audio_file)} transcribed)")
+            if self.transcription_queue.status()[0] == 0:
+                self.transcription_progress.setVisible(False)
+            self.refresh_transcript_list()
+            # Cache keys use the text as the view shows it, as on_transcript_loaded does
+            document = QTextDocument()
+            document.setPlainText(transcript)
+            self.run_all_prompts(document.toPlainText(), background=True)
+            return
         # Update transcript text area
+        self.live_view_file = None
+        self.current_transcript_id = transcript_id
         self.transcript_text.setPlainText(transcript)
         self.status_label.setText("Transcription complete.")
         # Hide the transcription progress indicator
         self.transcription_progress.setVisible(False)
-        # Save transcript to an encrypted file.
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        transcript_filename = os.path.join(TRANSCRIPTS_DIR, f"transcript_{timestamp}.bin")
-        save_encrypted_transcript(transcript_filename, transcript)
+        # The transcript was saved by the transcription job
         self.refresh_transcript_list()
+        # Results shown so far belong to the previous transcript
+        self.prompt_results = {}
+        self.setup_prompt_results_ui()
         # Run all prompts automatically
         self.run_all_prompts()
     
-    def generate_summary(self):
-        transcript = self.transcript_text.toPlainText().strip()
-        if not transcript:
-            QMessageBox.warning(self, "Warning", "No transcript available to summarize.")
-            return
-        self.status_label.setText("Generating summary...")
-        # Start summarization in background thread
-        t = threading.Thread(target=self.process_summary, args=(transcript,))
-        t.start()
-    
-    def process_summary(self, transcript):
-        summary = summarize_text(transcript)
-        self.summary_done.emit(summary)
-    
-    def on_summary_done(self, summary):
-        self.summary_text.setPlainText(summary)
-        self.status_label.setText("Summary complete.")
+    def on_transcription_failed(self, audio_file, error):
+        self.status_label.setText(f"Transcription of {os.path.basename(audio_file)} failed "
+                                  f"({error}); it will be retried at the next start.")
+        # Keep the indicator for recordings still queued behind it
+        if self.transcription_queue.status()[0] == 0:
+            self.transcription_progress.setVisible(False)
     
     def refresh_transcript_list(self):
         self.transcript_list.clear()
-        for fname in sorted(os.listdir(TRANSCRIPTS_DIR), reverse=True):
-            if fname.endswith(".bin"):
-                self.transcript_list.addItem(fname)
+        self.transcripts_listed = 0
+        self.load_more_transcripts()
+    
+    def load_more_transcripts(self):
+        """Append the next page of transcripts, newest first, to the list."""
+        entries = self.transcript_store.page(self.transcripts_listed, query=self.search_query)
+        for entry in entries:
+            item = QListWidgetItem(self.transcript_label(entry))
+            item.setData(Qt.UserRole, entry["id"])
+            item.setToolTip(entry["preview"])
+            self.transcript_list.addItem(item)
+        self.transcripts_listed += len(entries)
+    
+    def search_transcripts(self, text):
+        """List only transcripts containing every word typed; all of them when empty."""
+        self.search_query = text
+        self.refresh_transcript_list()
+    
+    def on_transcript_list_scrolled(self, value):
+        if value >= self.transcript_list.verticalScrollBar().maximum():
+            self.load_more_transcripts()
+    
+    @staticmethod
+    def transcript_label(entry):
+        label = datetime.datetime.fromtimestamp(entry["created"]).strftime("%Y-%m-%d %H:%M")
+        if entry["duration"]:
+            minutes, seconds = divmod(int(entry["duration"]), 60)
+            label += f"  {minutes}:{seconds:02d}"
+        if entry["prompts_total"]:
+            label += f"  ({entry['prompts_answered']}/{entry['prompts_total']} prompts)"
+        return label
     
     def load_transcript(self, item):
-        fname = item.text()
-        filepath = os.path.join(TRANSCRIPTS_DIR, fname)
-        transcript = load_encrypted_transcript(filepath)
+        """Decrypt the selected transcript off the UI thread."""
+        transcript_id = item.data(Qt.UserRole)
+        self.status_label.setText("Loading transcript...")
+        threading.Thread(
+            target=lambda: self.transcript_loaded.emit(transcript_id, self.transcript_store.load(transcript_id)),
+            daemon=True
+        ).start()
+    
+    def on_transcript_loaded(self, transcript_id, transcript):
+        self.live_view_file = None
+        self.current_transcript_id = transcript_id
         self.transcript_text.setPlainText(transcript)
-        # Clear prompt results if a different transcript is viewed.
+        # Show the cached results for this transcript; other prompts start empty.
+        # Keys use the widget's text, as run_all_prompts does.
+        transcript = self.transcript_text.toPlainText()
+        self.activate_transcript(transcript_key(transcript))
         self.prompt_results = {}
+        for prompt in self.prompt_config.prompts:
+            if prompt["enabled"]:
+                cached = self.prompt_cache.get(transcript, prompt["prompt"])
+                if cached is not None:
+                    self.prompt_results[prompt["name"]] = cached
         self.setup_prompt_results_ui()
-        self.status_label.setText(f"Loaded transcript: {fname}")
+        self.update_prompt_status()
+        self.status_label.setText("Transcript loaded.")
+    
+    def update_prompt_status(self):
+        """Record how many enabled prompts have an answer for the current transcript."""
+        if self.current_transcript_id is None:
+            return
+        enabled = [p["name"] for p in self.prompt_config.prompts if p["enabled"]]
+        answered = sum(1 for name in enabled
+                       if not self.prompt_results.get(name, "Error").startswith("Error"))
+        self.transcript_store.set_prompt_status(self.current_transcript_id, answered, len(enabled))
+        # Refresh the row's label in place if it is listed
+        for row in range(self.transcript_list.count()):
+            item = self.transcript_list.item(row)
+            if item.data(Qt.UserRole) == self.current_transcript_id:
+                label = item.text().split("  (")[0]
+                item.setText(f"{label}  ({answered}/{len(enabled)} prompts)" if enabled else label)
+                break
     
     # For auto logout you could override eventFilter here:
     # def eventFilter(self, obj, event):
@@ -623,6 +3260,7 @@ class MainWindow(QMainWindow):
             self.prompts_layout.itemAt(i).widget().setParent(None)
         # Clear previous prompt edits dictionary
         self.prompt_edits = {}
+        self.prompt_result_boxes = {}
         
         # Create widgets for each prompt
         for prompt in self.prompt_config.prompts:
@@ -663,6 +3301,7 @@ class MainWindow(QMainWindow):
                     lambda p=prompt["name"], t=result_text: self.on_prompt_result_edited(p, t)
                 )
                 layout.addWidget(result_text)
+                self.prompt_result_boxes[prompt["name"]] = result_text
                 
                 self.prompts_layout.addWidget(group)
     
@@ -683,8 +3322,8 @@ class MainWindow(QMainWindow):
                 transcript = self.transcript_text.toPlainText()
                 if not transcript:
                     return
-                full_prompt = f"Based on the following transcript, {used_prompt}:\n\n{transcript}"
-                threading.Thread(target=self.process_prompt, args=(prompt_name, full_prompt)).start()
+                self.activate_transcript(transcript_key(transcript))
+                self.submit_prompt(prompt_name, used_prompt, transcript, PRIORITY_INTERACTIVE)
                 break
     
     def copy_prompt_result(self, prompt_name):
@@ -701,45 +3340,113 @@ class MainWindow(QMainWindow):
         transcript = self.transcript_text.toPlainText()
         if not transcript:
             return
+        self.activate_transcript(transcript_key(transcript))
+        self.submit_prompt(prompt["name"], prompt["prompt"], transcript, PRIORITY_INTERACTIVE)
+    
+    def activate_transcript(self, key):
+        """Make `key` the transcript results are shown for; cancel work for any other."""
+        self.active_transcript_key = key
+        self.prompt_jobs.cancel_other_groups(key)
+    
+    def submit_prompt(self, prompt_name, instruction, transcript, priority=PRIORITY_BATCH, cancellable=True):
+        """
+        Queue one prompt; identical requests for the same transcript share one
+        job. Jobs that aren't `cancellable` keep running when another
+        transcript is opened.
+        """
+        key = transcript_key(transcript)
         
-        # Create the full prompt with context
-        full_prompt = f"Based on the following transcript, {prompt['prompt']}:\n\n{transcript}"
+        def _answer(on_text):
+            result = answer_prompt(transcript, instruction, on_text=on_text)
+            self.prompt_cache.put(transcript, instruction, result)
+            return result
         
-        # Run in background thread
-        thread = threading.Thread(
-            target=self.process_prompt,
-            args=(prompt["name"], full_prompt)
+        def _done(result, error):
+            if error is not None:
+                result = f"Error processing prompt: {str(error)}"
+            self.prompt_result_ready.emit(key, prompt_name, result)
+        
+        self.prompt_jobs.submit(
+            ("prompt", key, instruction), key, _answer, priority,
+            on_text=lambda text: self.prompt_result_partial.emit(key, prompt_name, text),
+            on_done=_done, cancellable=cancellable
         )
-        thread.start()
     
-    def process_prompt(self, prompt_name, full_prompt):
-        """Process a prompt in the background"""
-        try:
-            result = summarize_text(full_prompt)
-            self.prompt_result_ready.emit(prompt_name, result)
-        except Exception as e:
-            self.prompt_result_ready.emit(prompt_name, f"Error processing prompt: {str(e)}")
+    def on_prompt_result_partial(self, key, prompt_name, text):
+        """Show streamed text in the prompt's result box as it is generated"""
+        if key != self.active_transcript_key:
+            return
+        box = self.prompt_result_boxes.get(prompt_name)
+        if box is not None:
+            # Not a user edit, so keep on_prompt_result_edited out of it
+            box.blockSignals(True)
+            box.setPlainText(text)
+            box.blockSignals(False)
     
-    def on_prompt_result_ready(self, prompt_name, result):
+    def on_prompt_result_ready(self, key, prompt_name, result):
         """Handle completion of prompt processing"""
+        if key != self.active_transcript_key:
+            return  # Finished just as another transcript was opened
         self.prompt_results[prompt_name] = result
-        self.setup_prompt_results_ui()  # Refresh the UI
+        self.update_prompt_status()
+        box = self.prompt_result_boxes.get(prompt_name)
+        if box is not None:
+            box.setPlainText(result)
+        else:
+            self.setup_prompt_results_ui()  # Refresh the UI
     
-    def run_all_prompts(self):
-        """Run all enabled prompts sequentially in one background thread."""
-        def _process_all():
+    def run_all_prompts(self, transcript=None, background=False):
+        """
+        Queue all enabled prompts as batch jobs; they run one after another
+        and share the transcript prefix, so it is only evaluated for the
+        first. Answers already in the result cache are shown straight away.
+        In single-pass mode one job answers them all, and only the prompts
+        whose answer couldn't be parsed are queued on their own.
+        
+        `transcript` defaults to the one on screen. With `background`, the
+        view is left alone and the answers only go to the result cache; the
+        jobs aren't cancelled when another transcript is opened.
+        """
+        if transcript is None:
             transcript = self.transcript_text.toPlainText()
-            if not transcript:
-                return
-            for prompt in self.prompt_config.prompts:
-                if prompt["enabled"]:
-                    full_prompt = f"Based on the following transcript, {prompt['prompt']}:\n\n{transcript}"
-                    try:
-                        result = summarize_text(full_prompt)
-                    except Exception as e:
-                        result = f"Error processing prompt: {str(e)}"
-                    self.prompt_result_ready.emit(prompt["name"], result)
-        threading.Thread(target=_process_all).start()
+        if not transcript:
+            return
+        key = transcript_key(transcript)
+        if not background:
+            self.activate_transcript(key)
+        pending = []
+        for prompt in self.prompt_config.prompts:
+            if prompt["enabled"]:
+                cached = self.prompt_cache.get(transcript, prompt["prompt"])
+                if cached is None:
+                    pending.append(prompt)
+                elif not background:
+                    self.on_prompt_result_ready(key, prompt["name"], cached)
+        if not (self.single_pass_checkbox.isChecked() and len(pending) > 1):
+            for prompt in pending:
+                self.submit_prompt(prompt["name"], prompt["prompt"], transcript, cancellable=not background)
+            return
+        
+        fields = [(p["name"], p["prompt"]) for p in pending]
+        
+        def _done(answers, error):
+            if error is not None:
+                print("Single-pass prompts failed:", error)
+                answers = {}
+            for prompt in pending:
+                if prompt["name"] in answers:
+                    result = answers[prompt["name"]]
+                    self.prompt_cache.put(transcript, prompt["prompt"], result)
+                    self.prompt_result_ready.emit(key, prompt["name"], result)
+                else:
+                    self.submit_prompt(prompt["name"], prompt["prompt"], transcript,
+                                       cancellable=not background)
+        
+        self.prompt_jobs.submit(
+            ("single-pass", key, tuple(fields)), key,
+            lambda on_text: answer_prompts_together(transcript, fields, on_text), on_done=_done,
+            cancellable=not background
+        )
 
 def hash_password(password):
     return hashlib.sha256(password.encode("utf-8")).hexdigest()
@@ -768,7 +3475,7 @@ class UserManager:
         return username in self.users and self.users[username] == hash_password(password)
 
 def setup_user_environment(username):
-    global TRANSCRIPTS_DIR, AUDIO_DIR, KEY_FILE, PROMPTS_CONFIG_FILE
+    global TRANSCRIPTS_DIR, AUDIO_DIR, KEY_FILE, PROMPTS_CONFIG_FILE, PROMPT_CACHE_DIR
     base_dir = os.path.join("users", username)
     if not os.path.exists(base_dir):
         os.makedirs(base_dir)
@@ -776,9 +3483,11 @@ def setup_user_environment(username):
     AUDIO_DIR = os.path.join(base_dir, "audio")
     KEY_FILE = os.path.join(base_dir, "key.key")
     PROMPTS_CONFIG_FILE = os.path.join(base_dir, "prompts_config.json")
+    PROMPT_CACHE_DIR = os.path.join(base_dir, "prompt_cache")
     for folder in [TRANSCRIPTS_DIR, AUDIO_DIR]:
         if not os.path.exists(folder):
             os.makedirs(folder)
+    init_encryption()
 
 def main():
     app = QApplication(sys.argv)
@@ -797,7 +3506,12 @@ def main():
     # Create and show main window
     window = MainWindow()
     window.show()
+    
+    # Load models in the background; recording is usable right away
+    warm_up_models(window.model_status_changed.emit)
     sys.exit(app.exec_())
 
 if __name__ == "__main__":
+    # Needed for the transcription process pool in frozen builds
+    multiprocessing.freeze_support()
     main() 
\ No newline at end of file
@@ -34,6 +34,10 @@ setup(
     ],
     python_requires=">=3.8",
     install_requires=requirements,
+    extras_require={
+        # Faster LLM backend that reuses the transcript prefill across prompts
+        "llama": ["llama-cpp-python>=0.2.0"],
+    },
     entry_points={
         "console_scripts": [
             "openscriber=openscriber.openscriber:main",
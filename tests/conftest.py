@@ -0,0 +1,23 @@
+import os
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from openscriber import openscriber
+
+
+@pytest.fixture
+def user_dir(tmp_path, monkeypatch):
+    """Run in an empty directory with a fresh user key loaded."""
+    monkeypatch.chdir(tmp_path)
+    openscriber.init_encryption()
+    return tmp_path
+
+
+@pytest.fixture
+def store(user_dir):
+    (user_dir / "transcripts").mkdir()
+    store = openscriber.TranscriptStore(str(user_dir / "transcripts" / openscriber.TRANSCRIPT_DB_NAME))
+    yield store
+    store.close()
@@ -0,0 +1,72 @@
+import threading
+import time
+
+from openscriber import openscriber as osc
+
+
+def make_scheduler(cores):
+    scheduler = osc.CPUScheduler(whisper_share=0.75)
+    scheduler.cores = cores
+    return scheduler
+
+
+def test_workload_alone_gets_every_core():
+    scheduler = make_scheduler(8)
+    with scheduler.running(osc.WHISPER_MODEL) as threads:
+        assert threads == 8
+    with scheduler.running(osc.LLM_MODEL) as threads:
+        assert threads == 8
+
+
+def test_concurrent_workloads_split_the_cores():
+    scheduler = make_scheduler(8)
+    with scheduler.running(osc.WHISPER_MODEL):
+        with scheduler.running(osc.LLM_MODEL) as threads:
+            assert threads == 2
+            assert scheduler.threads_for(osc.WHISPER_MODEL) == 6
+    assert scheduler.threads_for(osc.WHISPER_MODEL) == 8
+
+
+def test_baseline_and_single_core_never_split():
+    scheduler = make_scheduler(8)
+    scheduler.share_cores = False
+    with scheduler.running(osc.WHISPER_MODEL):
+        assert scheduler.threads_for(osc.LLM_MODEL) == 8
+
+    scheduler = make_scheduler(1)
+    with scheduler.running(osc.WHISPER_MODEL):
+        assert scheduler.threads_for(osc.LLM_MODEL) == 1
+
+
+def test_llm_is_not_busy_while_loading(monkeypatch):
+    scheduler = make_scheduler(8)
+    loading, release = threading.Event(), threading.Event()
+
+    class Model:
+        def set_threads(self, threads):
+            self.threads = threads
+
+    def load():
+        loading.set()
+        release.wait(5)
+        return Model()
+
+    manager = osc.ModelManager()
+    manager.register(osc.LLM_MODEL, load)
+    monkeypatch.setattr(osc, "model_manager", manager)
+    monkeypatch.setattr(osc, "cpu_scheduler", scheduler)
+
+    used = []
+
+    def infer():
+        with osc.use_llm() as model:
+            used.append((model.threads, scheduler.threads_for(osc.WHISPER_MODEL)))
+
+    thread = threading.Thread(target=infer)
+    thread.start()
+    assert loading.wait(5)
+    time.sleep(0.02)
+    assert scheduler.threads_for(osc.WHISPER_MODEL) == 8
+    release.set()
+    thread.join(5)
+    assert used == [(8, 6)]
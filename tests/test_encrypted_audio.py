@@ -0,0 +1,97 @@
+import os
+import wave
+
+import numpy as np
+import pytest
+
+from openscriber import openscriber as osc
+
+
+def write_session(path, samples, segment_frames=1000):
+    writer = osc.EncryptedAudioWriter(path, 1, 2, osc.WHISPER_SAMPLE_RATE, segment_frames=segment_frames)
+    writer.write(samples)
+    return writer
+
+
+def test_round_trip_and_random_access(user_dir):
+    samples = np.arange(-1500, 1500, dtype=np.int16)
+    path = str(user_dir / "session.osa")
+    write_session(path, samples).close()
+
+    with osc.EncryptedAudioReader(path) as reader:
+        assert reader.frames == samples.shape[0]
+        assert reader.segments == 3
+        assert reader.read_frames(0, reader.frames) == samples.tobytes()
+        # A range spanning a segment boundary only touches the segments it needs
+        assert reader.read_frames(950, 100) == samples[950:1050].tobytes()
+        assert reader.read_frames(2900, 500) == samples[2900:].tobytes()
+    assert osc.audio_duration(path) == pytest.approx(samples.shape[0] / osc.WHISPER_SAMPLE_RATE)
+
+
+def test_read_window_while_writing(user_dir):
+    samples = np.arange(2500, dtype=np.int16)
+    writer = write_session(str(user_dir / "session.osa.part"), samples)
+    # Only complete segments are on disk until close()
+    assert writer.frames_written == 2000
+    np.testing.assert_array_equal(writer.read_window(1500, 1000),
+                                  osc.pcm16_to_float32(samples[1500:2000]))
+    writer.close()
+
+
+def test_tampered_segment_is_rejected(user_dir):
+    path = str(user_dir / "session.osa")
+    write_session(path, np.zeros(2000, dtype=np.int16)).close()
+    with open(path, "r+b") as f:
+        f.seek(osc.AUDIO_HEADER_SIZE + 10)
+        f.write(b"\xff")
+    with osc.EncryptedAudioReader(path) as reader:
+        with pytest.raises(osc.EncryptedAudioError):
+            reader.read_frames(0, 10)
+
+
+def test_truncated_header_index_is_rejected(user_dir):
+    path = str(user_dir / "session.osa")
+    write_session(path, np.zeros(2000, dtype=np.int16)).close()
+    with open(path, "r+b") as f:
+        f.seek(osc.AUDIO_HEADER_FORMAT.size)
+        f.write(osc.AUDIO_HEADER_INDEX.pack(1, 1000))
+    with pytest.raises(osc.EncryptedAudioError):
+        osc.EncryptedAudioReader(path)
+
+
+def test_recover_partial_recordings(user_dir):
+    audio_dir = user_dir / "audio"
+    audio_dir.mkdir()
+    samples = np.arange(2500, dtype=np.int16)
+    # Crash mid-recording: two segments synced, the rest still buffered, plus a torn write
+    crashed = write_session(str(audio_dir / "session_1.osa.part"), samples)
+    crashed._file.close()
+    with open(audio_dir / "session_1.osa.part", "ab") as f:
+        f.write(b"torn segment")
+    # A session that crashed before anything was captured
+    write_session(str(audio_dir / "session_2.osa.part"), np.zeros(0, dtype=np.int16)).close()
+
+    recovered = osc.recover_partial_recordings(str(audio_dir))
+
+    assert recovered == [str(audio_dir / "session_1.osa")]
+    assert sorted(os.listdir(audio_dir)) == ["session_1.osa"]
+    with osc.EncryptedAudioReader(recovered[0]) as reader:
+        assert reader.frames == 2000
+        assert reader.read_frames(0, 2000) == samples[:2000].tobytes()
+
+
+def test_import_is_stored_encrypted(user_dir):
+    source = str(user_dir / "visit.wav")
+    samples = (np.sin(np.arange(8000) / 10) * 10000).astype(np.int16)
+    with wave.open(source, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(8000)
+        wf.writeframes(samples.tobytes())
+
+    imported = str(user_dir / "import_visit.osa")
+    assert osc.encrypt_audio_file(source, imported) == pytest.approx(1.0)
+    assert not os.path.exists(imported + ".tmp")
+    assert osc.is_encrypted_audio(imported)
+    assert samples.tobytes()[:64] not in open(imported, "rb").read()
+    assert np.allclose(osc.load_audio_16k(imported), osc.load_audio_16k(source), atol=1e-3)
@@ -0,0 +1,45 @@
+from openscriber import openscriber as osc
+
+
+class FakeLLM:
+    """Whitespace tokenizer; each part answer is the first and last word of its chunk."""
+    context_length = 40
+
+    def __init__(self):
+        self.prompts = []
+
+    def tokenize(self, text):
+        return text.split()
+
+    def detokenize(self, tokens):
+        return " ".join(tokens)
+
+    def set_threads(self, threads):
+        pass
+
+    def complete(self, prompt, max_new_tokens, on_text=None):
+        self.prompts.append(prompt)
+        kind, text = prompt.split(" ", 1)
+        words = text.split()
+        return f"{words[0]}-{words[-1]}" if kind == "part" else "combined: " + " ".join(words)
+
+
+def test_split_tokens_overlap():
+    assert osc.split_tokens(10, 4, 1) == [(0, 4), (3, 7), (6, 10)]
+    assert osc.split_tokens(3, 4, 1) == [(0, 3)]
+
+
+def test_map_reduce_covers_every_chunk(monkeypatch):
+    model = FakeLLM()
+    manager = osc.ModelManager()
+    manager.register(osc.LLM_MODEL, lambda: model)
+    monkeypatch.setattr(osc, "model_manager", manager)
+    monkeypatch.setattr(osc, "available_memory", lambda: 0)  # No extra replicas
+    monkeypatch.setattr(osc, "MAP_REDUCE_PROMPT_RESERVE", 0)
+
+    text = " ".join(f"w{i}" for i in range(100))
+    result = osc.map_reduce_text(text, "part {text}", "combine {text}", max_new_tokens=10)
+
+    # Budget is 40 - 10 answer - 1 template token = 29, with a quarter of it overlapping
+    assert result == "combined: w0-w28 w22-w50 w44-w72 w66-w94 w88-w99"
+    assert all(len(prompt.split()) <= 30 for prompt in model.prompts)
@@ -0,0 +1,71 @@
+import threading
+import time
+
+import pytest
+
+from openscriber import openscriber as osc
+
+
+def test_concurrent_acquires_share_one_load():
+    calls = []
+    release = threading.Event()
+
+    def load():
+        calls.append(1)
+        release.wait(5)
+        return object()
+
+    manager = osc.ModelManager()
+    manager.register("model", load)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(manager.acquire("model"))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert len(results) == 4 and all(model is results[0] for model in results)
+    assert manager.acquire("model") is results[0]
+
+
+def test_failed_load_is_retried():
+    attempts = []
+
+    def load():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("download failed")
+        return "model"
+
+    manager = osc.ModelManager()
+    manager.register("model", load)
+    with pytest.raises(RuntimeError):
+        manager.acquire("model")
+    assert manager.acquire("model") == "model"
+    assert len(attempts) == 2
+
+
+def test_use_runs_one_inference_at_a_time():
+    manager = osc.ModelManager()
+    manager.register("model", object)
+    active, peak = [], []
+    lock = threading.Lock()
+
+    def infer():
+        with manager.use("model"):
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.01)
+            with lock:
+                active.pop()
+
+    threads = [threading.Thread(target=infer) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert max(peak) == 1
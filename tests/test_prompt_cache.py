@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+from openscriber import openscriber as osc
+
+
+@pytest.fixture
+def cache(user_dir):
+    return osc.PromptResultCache(str(user_dir / "prompt_cache"))
+
+
+def test_round_trip_is_encrypted(cache, user_dir):
+    cache.put("The patient takes sertraline.", "List medications", "Sertraline")
+    assert cache.get("The patient takes sertraline.", "List medications") == "Sertraline"
+    assert cache.get("The patient takes sertraline.", "List side effects") is None
+    for fname in os.listdir(user_dir / "prompt_cache"):
+        assert b"Sertraline" not in (user_dir / "prompt_cache" / fname).read_bytes()
+
+
+def test_key_covers_transcript_prompt_backend_and_settings(cache, monkeypatch):
+    key = cache.key("transcript", "instruction")
+    assert cache.key("transcript", "instruction") == key
+    assert cache.key("transcript.", "instruction") != key
+    assert cache.key("transcript", "instruction.") != key
+    monkeypatch.setattr(osc, "current_llm_backend", lambda: "some other backend")
+    assert cache.key("transcript", "instruction") != key
+    monkeypatch.undo()
+    monkeypatch.setitem(osc.LLM_SAMPLING, "temperature", 0.1)
+    assert cache.key("transcript", "instruction") != key
+
+
+def test_least_recently_used_entries_are_evicted(user_dir):
+    cache = osc.PromptResultCache(str(user_dir / "prompt_cache"), max_entries=10)
+    for i in range(10):
+        cache.put("transcript", f"prompt {i}", f"answer {i}")
+    assert cache.get("transcript", "prompt 0") == "answer 0"  # Now the most recent
+    cache.put("transcript", "prompt 10", "answer 10")
+
+    # Trimmed in one batch to 90% of the limit, oldest first
+    kept = [i for i in range(11) if cache.get("transcript", f"prompt {i}") is not None]
+    assert kept == [0, 3, 4, 5, 6, 7, 8, 9, 10]
+    assert len(os.listdir(user_dir / "prompt_cache")) == 9
+
+
+def test_byte_limit_and_index_rebuilt_from_disk(user_dir):
+    cache_dir = str(user_dir / "prompt_cache")
+    cache = osc.PromptResultCache(cache_dir)
+    for i in range(5):
+        cache.put("transcript", f"prompt {i}", "x" * 100)
+    size = os.path.getsize(os.path.join(cache_dir, os.listdir(cache_dir)[0]))
+
+    reopened = osc.PromptResultCache(cache_dir, max_bytes=size * 5)
+    reopened.put("transcript", "prompt 5", "x" * 100)
+    assert len(os.listdir(cache_dir)) == 4
+    assert reopened.get("transcript", "prompt 5") is not None
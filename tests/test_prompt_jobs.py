@@ -0,0 +1,72 @@
+import threading
+
+from openscriber import openscriber as osc
+
+
+def blocking_job():
+    """A job that holds the worker until released, so later submissions queue up."""
+    started, release = threading.Event(), threading.Event()
+
+    def fn(on_text):
+        started.set()
+        release.wait(5)
+        on_text("still running")
+        return "blocker"
+    return fn, started, release
+
+
+def recorder(order, name, finished=None):
+    def on_done(result, error):
+        order.append((name, result, error))
+        if finished is not None:
+            finished.set()
+    return on_done
+
+
+def test_most_urgent_job_runs_first():
+    scheduler = osc.PromptJobScheduler(workers=1)
+    fn, started, release = blocking_job()
+    order, finished = [], threading.Event()
+    scheduler.submit("blocker", "a", fn)
+    assert started.wait(5)
+    scheduler.submit("batch", "a", lambda on_text: 1, osc.PRIORITY_BATCH, on_done=recorder(order, "batch", finished))
+    scheduler.submit("shown", "a", lambda on_text: 2, osc.PRIORITY_INTERACTIVE, on_done=recorder(order, "shown"))
+    release.set()
+    assert finished.wait(5)
+    assert order == [("shown", 2, None), ("batch", 1, None)]
+
+
+def test_same_key_runs_once_for_every_submitter():
+    scheduler = osc.PromptJobScheduler(workers=1)
+    fn, started, release = blocking_job()
+    scheduler.submit("blocker", "a", fn)
+    assert started.wait(5)
+    runs, order, finished = [], [], threading.Event()
+
+    def work(on_text):
+        runs.append(1)
+        return "answer"
+    first = scheduler.submit("prompt", "a", work, on_done=recorder(order, "first"))
+    second = scheduler.submit("prompt", "a", work, on_done=recorder(order, "second", finished))
+    assert first is second
+    release.set()
+    assert finished.wait(5)
+    assert runs == [1]
+    assert order == [("first", "answer", None), ("second", "answer", None)]
+
+
+def test_other_groups_are_cancelled_unless_kept():
+    scheduler = osc.PromptJobScheduler(workers=1)
+    fn, started, release = blocking_job()
+    order, finished = [], threading.Event()
+    scheduler.submit("running", "old", fn, on_done=recorder(order, "running"))
+    assert started.wait(5)
+    scheduler.submit("queued", "old", lambda on_text: 1, on_done=recorder(order, "queued"))
+    scheduler.submit("kept", "background", lambda on_text: 2, on_done=recorder(order, "kept"), cancellable=False)
+    scheduler.submit("current", "new", lambda on_text: 3, osc.PRIORITY_BATCH + 1,
+                     on_done=recorder(order, "current", finished))
+    scheduler.cancel_other_groups("new")
+    release.set()
+    assert finished.wait(5)
+    # The running job stops at its next streamed update without calling back
+    assert order == [("kept", 2, None), ("current", 3, None)]
@@ -0,0 +1,23 @@
+from openscriber import openscriber as osc
+
+NAMES = ["Side Effects", "Medications"]
+
+
+def test_parse_multi_answer_json():
+    reply = 'Sure.\n{"Side Effects": "Nausea", "Medications": ["Sertraline 50 mg", "Melatonin 3 mg"]}'
+    assert osc.parse_multi_answer(reply, NAMES) == {
+        "Side Effects": "Nausea",
+        "Medications": "Sertraline 50 mg\nMelatonin 3 mg",
+    }
+
+
+def test_parse_multi_answer_truncated_reply():
+    # Generation stopped mid-object: the complete pair is still recovered
+    reply = '{"Side Effects": "NONE", "Medications": "Sertral'
+    assert osc.parse_multi_answer(reply, NAMES) == {"Side Effects": "NONE"}
+
+
+def test_parse_multi_answer_skips_empty_and_unknown():
+    reply = '{"Side Effects": "  ", "Other": "x", "Medications": 5}'
+    assert osc.parse_multi_answer(reply, NAMES) == {"Medications": "5"}
+    assert osc.parse_multi_answer("no json here", NAMES) == {}
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from openscriber import openscriber as osc
+
+pyaudio = pytest.importorskip("pyaudio")
+
+
+def deliver(capture, samples, status=0):
+    return capture.callback(np.asarray(samples, dtype=np.int16).tobytes(), len(samples), None, status)
+
+
+def drain(capture, size=100):
+    out = np.empty(size, dtype=np.int16)
+    return out[:capture.read_into(out)]
+
+
+def test_reads_across_the_wraparound():
+    capture = osc.RingBufferCapture(rate=10, seconds=1)  # Ten samples
+    assert deliver(capture, range(7)) == (None, pyaudio.paContinue)
+    np.testing.assert_array_equal(drain(capture, 5), range(5))
+    deliver(capture, range(7, 13))  # Wraps past the end of the ring
+    np.testing.assert_array_equal(drain(capture), range(5, 13))
+    assert capture.overruns == 0
+    assert drain(capture).shape[0] == 0
+
+
+def test_overrun_keeps_the_newest_samples():
+    capture = osc.RingBufferCapture(rate=10, seconds=1)
+    deliver(capture, range(8))
+    deliver(capture, range(8, 14))
+    assert capture.ring_overruns == 1
+    assert capture.dropped_samples == 4
+    np.testing.assert_array_equal(drain(capture), range(4, 14))
+
+
+def test_input_overflow_is_counted():
+    capture = osc.RingBufferCapture(rate=10, seconds=1)
+    deliver(capture, range(3), status=pyaudio.paInputOverflow)
+    assert capture.input_overflows == 1
+    assert capture.overruns == 1
+    np.testing.assert_array_equal(drain(capture), range(3))
+
+
+def test_wait_and_wake():
+    capture = osc.RingBufferCapture(rate=10, seconds=1)
+    assert not capture.wait(timeout=0)
+    deliver(capture, [1])
+    assert capture.wait(timeout=0)
+    capture.wake()
+    assert capture.wait(timeout=0)
@@ -0,0 +1,19 @@
+from openscriber import openscriber as osc
+
+
+def test_search_matches_all_words(store):
+    first = store.add("Sertraline 50 mg was continued.", created=1000.0)
+    second = store.add("Started sertraline; sleep is poor.", created=2000.0)
+
+    assert [e["id"] for e in store.page(query="SERTRALINE")] == [second, first]
+    assert [e["id"] for e in store.page(query="sertraline sleep")] == [second]
+    assert store.page(query="lithium") == []
+    assert store.page(query="a") == []  # Too short to be indexed
+
+
+def test_migrated_transcripts_are_searchable(store, user_dir):
+    for i in range(3):
+        osc.save_encrypted_transcript(str(user_dir / "transcripts" / f"transcript_2024010{i + 1}_120000.bin"),
+                                      f"legacy transcript {i}")
+    assert store.migrate_legacy_files(str(user_dir / "transcripts")) == 3
+    assert len(store.page(query="legacy")) == 3
@@ -0,0 +1,75 @@
+import pytest
+
+from openscriber import openscriber as osc
+
+
+def test_add_page_and_load(store):
+    first = store.add("The patient reports sleeping better.", created=1000.0, duration=60.0)
+    second = store.add("Sertraline 50 mg was continued.", created=2000.0, audio_file="audio/session.osa")
+
+    entries = store.page()
+    assert [entry["id"] for entry in entries] == [second, first]
+    assert entries[1]["duration"] == 60.0
+    assert entries[1]["preview"] == "The patient reports sleeping better."
+    assert store.load(first) == "The patient reports sleeping better."
+    assert store.page(offset=1, limit=1)[0]["id"] == first
+
+
+def test_text_is_stored_encrypted(store, user_dir):
+    store.add("Sertraline 50 mg was continued.")
+    store.close()
+    data = (user_dir / "transcripts" / osc.TRANSCRIPT_DB_NAME).read_bytes()
+    assert b"Sertraline" not in data
+    assert b"sertraline" not in data
+
+
+def test_prompt_status(store):
+    transcript_id = store.add("text")
+    store.set_prompt_status(transcript_id, 1, 2)
+    entry = store.page()[0]
+    assert (entry["prompts_answered"], entry["prompts_total"]) == (1, 2)
+
+
+def write_legacy_files(user_dir, count):
+    for i in range(count):
+        osc.save_encrypted_transcript(str(user_dir / "transcripts" / f"transcript_2024010{i + 1}_120000.bin"),
+                                      f"legacy transcript {i}")
+
+
+def test_migrate_legacy_files_once(store, user_dir):
+    write_legacy_files(user_dir, 3)
+    assert store.migrate_legacy_files(str(user_dir / "transcripts")) == 3
+    assert store.migrate_legacy_files(str(user_dir / "transcripts")) == 0
+
+    entries = store.page()
+    assert [e["name"] for e in entries] == ["transcript_20240103_120000", "transcript_20240102_120000",
+                                            "transcript_20240101_120000"]
+    assert store.load(entries[-1]["id"]) == "legacy transcript 0"
+
+
+def test_interrupted_migration_leaves_no_duplicates(store, user_dir, monkeypatch):
+    write_legacy_files(user_dir, 3)
+    insert = store._insert
+    calls = []
+
+    def crash_on_third(*args, **kwargs):
+        calls.append(args)
+        if len(calls) == 3:
+            raise RuntimeError("crash")
+        return insert(*args, **kwargs)
+
+    monkeypatch.setattr(store, "_insert", crash_on_third)
+    with pytest.raises(RuntimeError):
+        store.migrate_legacy_files(str(user_dir / "transcripts"))
+    monkeypatch.setattr(store, "_insert", insert)
+    assert store.page() == []
+
+    assert store.migrate_legacy_files(str(user_dir / "transcripts")) == 3
+    assert len(store.page()) == 3
+
+
+def test_partly_migrated_store_skips_existing_names(store, user_dir):
+    write_legacy_files(user_dir, 2)
+    store.add("legacy transcript 0", name="transcript_20240101_120000")
+    assert store.migrate_legacy_files(str(user_dir / "transcripts")) == 1
+    assert len(store.page()) == 2
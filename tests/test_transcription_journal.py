@@ -0,0 +1,46 @@
+from openscriber import openscriber as osc
+
+
+def test_replay_rebuilds_transcript(user_dir):
+    audio_file = str(user_dir / "session.osa")
+    journal = osc.TranscriptionJournal(audio_file)
+    journal.append(480000, "first window")
+    journal.append(960000)  # Silence, skipped
+    journal.append(1440000, "third window")
+    journal.close()
+
+    assert osc.TranscriptionJournal(audio_file).replay() == (1440000, "first window third window ")
+
+
+def test_torn_record_is_dropped(user_dir):
+    audio_file = str(user_dir / "session.osa")
+    journal = osc.TranscriptionJournal(audio_file)
+    journal.append(480000, "first window")
+    journal.close()
+    with open(journal.path, "ab") as f:
+        f.write(b"gAAAAAtorn")  # Crash in the middle of a record
+
+    resumed = osc.TranscriptionJournal(audio_file)
+    assert resumed.replay() == (480000, "first window ")
+    # New records start on a clean line after the torn one is cut off
+    resumed.append(960000, "second window")
+    resumed.close()
+    assert osc.TranscriptionJournal(audio_file).replay() == (960000, "first window second window ")
+
+
+def test_legacy_state_is_moved_into_journal(user_dir):
+    audio_file = str(user_dir / "session.wav")
+    with open(audio_file + ".state", "w") as f:
+        f.write('{"processed_samples": 480000, "transcript": "from the old format "}')
+
+    journal = osc.TranscriptionJournal(audio_file)
+    assert journal.replay() == (480000, "from the old format ")
+    journal.close()
+    assert not (user_dir / "session.wav.state").exists()
+
+
+def test_remove(user_dir):
+    journal = osc.TranscriptionJournal(str(user_dir / "session.osa"))
+    journal.append(480000, "text")
+    journal.remove()
+    assert osc.TranscriptionJournal(str(user_dir / "session.osa")).replay() == (0, "")
@@ -0,0 +1,79 @@
+import threading
+
+from openscriber import openscriber as osc
+
+
+def make_files(user_dir, *names):
+    paths = [str(user_dir / name) for name in names]
+    for path in paths:
+        open(path, "wb").close()
+    return paths
+
+
+def wait_until_idle(queue):
+    for _ in range(500):
+        if queue.status()[0] == 0:
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError("queue did not drain")
+
+
+def test_jobs_run_in_order(user_dir):
+    files = make_files(user_dir, "a.wav", "b.wav")
+    ran = []
+    queue = osc.TranscriptionQueue(str(user_dir), lambda job, report_progress: ran.append(job.audio_file))
+    for path in files:
+        queue.submit(path)
+    wait_until_idle(queue)
+
+    assert ran == files
+    assert osc.TranscriptionQueue(str(user_dir), None).resume() == []
+
+
+def test_failed_job_is_reported_and_resumed(user_dir):
+    audio_file, = make_files(user_dir, "a.wav")
+    errors = []
+    reported = threading.Event()
+
+    def fail(job, report_progress):
+        raise RuntimeError("model failed to load")
+
+    def on_error(path, error):
+        errors.append((path, str(error)))
+        reported.set()
+
+    queue = osc.TranscriptionQueue(str(user_dir), fail, on_error=on_error)
+    queue.submit(audio_file)
+    assert reported.wait(5)
+
+    assert errors == [(audio_file, "model failed to load")]
+    # No journal was written, but the manifest still lists it
+    resumed = osc.TranscriptionQueue(str(user_dir), lambda job, report_progress: None).resume()
+    assert resumed == [audio_file]
+
+
+def test_eta_uses_the_duration_given_or_found_while_running(user_dir):
+    given, found = make_files(user_dir, "given.osa.part", "found.mp3")
+    started = {path: threading.Event() for path in (given, found)}
+    release = {path: threading.Event() for path in (given, found)}
+
+    def run(job, report_progress):
+        if job.audio_file == found:
+            job.duration = 40.0  # As process_transcription reports once decoded
+            report_progress(0.5)
+        started[job.audio_file].set()
+        release[job.audio_file].wait(5)
+
+    queue = osc.TranscriptionQueue(str(user_dir), run)
+    queue.submit(given, duration=60.0)
+    assert started[given].wait(5)
+    assert queue.status() == (1, 60.0 * osc.DEFAULT_REALTIME_FACTOR)
+    queue.submit(found)
+    # Not decoded yet, so assumed as long as the others
+    assert queue.status() == (2, 120.0 * osc.DEFAULT_REALTIME_FACTOR)
+
+    release[given].set()
+    assert started[found].wait(5)
+    assert queue.status() == (1, 20.0 * osc.DEFAULT_REALTIME_FACTOR)
+    release[found].set()
+    wait_until_idle(queue)
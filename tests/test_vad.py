@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from openscriber import openscriber as osc
+
+SR = osc.WHISPER_SAMPLE_RATE
+
+
+def bursts_over_noise(seconds, snr_db, seed=0):
+    """Tone syllables (250 ms on, 100 ms off) in 4 s phrases with 2 s pauses, over white noise."""
+    t = np.arange(int(seconds * SR)) / SR
+    envelope = ((t % 0.35) < 0.25) & ((t % 6) < 4)
+    speech = np.sin(2 * np.pi * 220 * t) * envelope
+    noise_power = np.mean(speech[envelope] ** 2) / 10 ** (snr_db / 10)
+    noise = np.random.default_rng(seed).standard_normal(t.shape[0]) * np.sqrt(noise_power)
+    audio = speech + noise
+    return (audio * 0.1 / np.abs(audio).max()).astype(np.float32)
+
+
+def coverage(regions, n):
+    return sum(end - start for start, end in regions) / n
+
+
+def test_digital_silence_has_no_windows():
+    audio = np.zeros(60 * SR, dtype=np.float32)
+    assert osc.detect_speech(audio) == []
+    assert osc.plan_windows(audio, 0) == []
+
+
+@pytest.mark.parametrize("snr_db", [10, 6, 3])
+def test_speech_near_the_noise_floor_is_found(snr_db):
+    audio = bursts_over_noise(60, snr_db)
+    assert coverage(osc.detect_speech(audio), audio.shape[0]) > 0.6
+
+
+def test_steady_noise_is_not_speech():
+    audio = (np.random.default_rng(1).standard_normal(60 * SR) * 0.01).astype(np.float32)
+    assert coverage(osc.detect_speech(audio), audio.shape[0]) < 0.05
+
+
+@pytest.mark.parametrize("level_db", [-60, -50, -45, -40, -35, -20])
+def test_steady_noise_is_skipped_at_any_level(level_db):
+    audio = (np.random.default_rng(2).standard_normal(30 * SR) * 10 ** (level_db / 20)).astype(np.float32)
+    assert osc.plan_windows(audio, 0) == []
+
+
+def test_audible_audio_without_detected_speech_falls_back_to_the_grid():
+    # Speech throughout: the noise floor estimate is speech itself
+    t = np.arange(60 * SR) / SR
+    audio = (0.1 * np.sin(2 * np.pi * 220 * t) * (0.6 + 0.4 * np.sin(2 * np.pi * 3 * t))).astype(np.float32)
+    assert osc.plan_windows(audio, 1000) == [(1000, 1000 + osc.WINDOW_SAMPLES),
+                                             (1000 + osc.WINDOW_SAMPLES, 1000 + 2 * osc.WINDOW_SAMPLES)]
+
+
+def test_plan_without_vad_is_the_fixed_grid():
+    audio = np.zeros(70 * SR, dtype=np.float32)
+    assert osc.plan_windows(audio, 0, vad=False) == [(0, 30 * SR), (30 * SR, 60 * SR), (60 * SR, 70 * SR)]
+
+
+def test_pack_speech_windows():
+    w = 100
+    # Regions share a window while they fit, silence between them included
+    assert osc.pack_speech_windows([(0, 20), (50, 90), (95, 150)], window=w) == [(0, 90), (95, 150)]
+    # A region longer than a window is split at window length
+    assert osc.pack_speech_windows([(10, 260)], window=w) == [(10, 110), (110, 210), (210, 260)]
+    assert osc.pack_speech_windows([], window=w) == []